@@ -4,15 +4,18 @@ FastAPI application server for Google Ads Automation API.
 Provides health checks, GAQL/mutate operations, and admin endpoints.
 """
 
+import asyncio
 import logging
 import os
+import socket
 from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional
 
 import redis.asyncio as redis
-from fastapi import FastAPI, HTTPException, Depends, status
+from redis.utils import HIREDIS_AVAILABLE
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
 from core.google_ads_manager import (
     GoogleAdsManager,
@@ -22,7 +25,7 @@ from core.google_ads_manager import (
 )
 from core.quota import QuotaGovernor, SLATier
 from core.scheduler import PriorityScheduler
-from core.cache import CacheManager
+from core.cache import CacheManager, ServiceTTL
 from core.errors import AdsAPIError
 from security.auth import (
     init_jwt_config,
@@ -44,8 +47,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Global state (initialized on startup)
-app_state: Dict[str, Any] = {}
+# Upper bound on each dependency probe in health/readiness checks (seconds)
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "0.5"))
+
+
+def _redis_keepalive_options() -> Dict[int, int]:
+    """TCP keepalive tuning for Redis sockets (options missing on this OS are skipped)."""
+    options: Dict[int, int] = {}
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        option = getattr(socket, name, None)
+        if option is not None:
+            options[option] = value
+    return options
 
 
 @asynccontextmanager
@@ -57,15 +70,40 @@ async def lifespan(app: FastAPI):
     """
     logger.info("Starting application...")
 
-    # Initialize Redis
+    scheduler_workers = int(os.getenv("SCHEDULER_WORKERS", "8"))
+
+    # Initialize Redis (explicitly sized pool with keepalive sockets). The
+    # blocking pool makes bursts above max_connections wait up to
+    # REDIS_POOL_TIMEOUT for a free connection instead of failing with
+    # "Too many connections"; it is sized so every scheduler worker can
+    # have commands in flight alongside request handlers. Read-only batches
+    # should use pipeline(transaction=False) to skip MULTI/EXEC.
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-    redis_client = redis.from_url(redis_url, decode_responses=False)
-    app_state["redis"] = redis_client
-    logger.info(f"Connected to Redis: {redis_url}")
+    redis_max_connections = int(
+        os.getenv("REDIS_MAX_CONNECTIONS", str(max(64, 2 * scheduler_workers)))
+    )
+    redis_pool = redis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=redis_max_connections,
+        timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "2")),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+        socket_keepalive=os.getenv("REDIS_SOCKET_KEEPALIVE", "true").lower() == "true",
+        socket_keepalive_options=_redis_keepalive_options(),
+        health_check_interval=30,
+        retry_on_timeout=True,
+        decode_responses=False,
+    )
+    # from_pool hands pool ownership to the client, so close() disconnects it
+    redis_client = redis.Redis.from_pool(redis_pool)
+    app.state.redis = redis_client
+    logger.info(
+        f"Connected to Redis: {redis_url} (pool size: {redis_max_connections}, "
+        f"parser: {'hiredis' if HIREDIS_AVAILABLE else 'python'})"
+    )
 
     # Initialize Quota Governor
     quota_governor = QuotaGovernor(redis_client)
-    app_state["quota_governor"] = quota_governor
+    app.state.quota_governor = quota_governor
 
     # Initialize global quota if not set
     global_quota = int(os.getenv("GLOBAL_DAILY_QUOTA", "1000000"))
@@ -73,16 +111,15 @@ async def lifespan(app: FastAPI):
     logger.info(f"Global quota set to {global_quota}")
 
     # Initialize Priority Scheduler
-    scheduler_workers = int(os.getenv("SCHEDULER_WORKERS", "8"))
     scheduler = PriorityScheduler(workers=scheduler_workers)
-    app_state["scheduler"] = scheduler
+    app.state.scheduler = scheduler
     await scheduler.start()
     logger.info(f"Scheduler started with {scheduler_workers} workers")
 
     # Initialize Cache Manager
     lru_size = int(os.getenv("LRU_CACHE_SIZE", "10000"))
     cache_manager = CacheManager(redis_client, lru_maxsize=lru_size)
-    app_state["cache_manager"] = cache_manager
+    app.state.cache_manager = cache_manager
     logger.info(f"Cache manager initialized (LRU size: {lru_size})")
 
     # Initialize Google Ads Manager
@@ -93,7 +130,7 @@ async def lifespan(app: FastAPI):
         cache_manager=cache_manager,
         use_mock=use_mock,
     )
-    app_state["ads_manager"] = ads_manager
+    app.state.ads_manager = ads_manager
     logger.info(f"Google Ads Manager initialized (mock={use_mock})")
 
     # Initialize JWT
@@ -103,9 +140,10 @@ async def lifespan(app: FastAPI):
         audience=os.getenv("API_JWT_AUDIENCE", "ads-api"),
         issuer=os.getenv("API_JWT_ISSUER", "ads-auth"),
         expiry_minutes=int(os.getenv("JWT_EXPIRY_MINUTES", "15")),
+        allow_mock_keys=os.getenv("JWT_ALLOW_MOCK_KEYS", "false").lower() == "true",
     )
     init_jwt_config(jwt_config)
-    app_state["jwt_config"] = jwt_config
+    app.state.jwt_config = jwt_config
     logger.info("JWT configuration initialized")
 
     logger.info("Application startup complete")
@@ -116,13 +154,23 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down application...")
 
     # Stop scheduler
-    if "scheduler" in app_state:
-        await app_state["scheduler"].stop()
+    if hasattr(app.state, "scheduler"):
+        await app.state.scheduler.stop()
         logger.info("Scheduler stopped")
 
+    # Flush batched quota charges/refunds
+    if hasattr(app.state, "quota_governor"):
+        await app.state.quota_governor.flush()
+        logger.info("Quota deductions flushed")
+
+    # Flush queued cache writes
+    if hasattr(app.state, "cache_manager"):
+        await app.state.cache_manager.close()
+        logger.info("Cache writes flushed")
+
     # Close Redis
-    if "redis" in app_state:
-        await app_state["redis"].close()
+    if hasattr(app.state, "redis"):
+        await app.state.redis.close()
         logger.info("Redis connection closed")
 
     logger.info("Application shutdown complete")
@@ -137,10 +185,43 @@ app = FastAPI(
 )
 
 
+# Dependency providers for resources created in lifespan()
+
+def get_redis(request: Request) -> redis.Redis:
+    """Get the shared Redis client."""
+    return request.app.state.redis
+
+
+def get_quota_governor(request: Request) -> QuotaGovernor:
+    """Get the quota governor."""
+    return request.app.state.quota_governor
+
+
+def get_scheduler(request: Request) -> PriorityScheduler:
+    """Get the priority scheduler."""
+    return request.app.state.scheduler
+
+
+def get_cache_manager(request: Request) -> CacheManager:
+    """Get the cache manager."""
+    return request.app.state.cache_manager
+
+
+def get_ads_manager(request: Request) -> GoogleAdsManager:
+    """Get the Google Ads manager."""
+    return request.app.state.ads_manager
+
+
 # Pydantic models for requests/responses
 
+# Immutable, ignore unknown fields, skip re-validating defaults
+MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore", validate_default=False)
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
+    model_config = MODEL_CONFIG
+
     status: str
     version: str
     components: Dict[str, bool]
@@ -148,6 +229,8 @@ class HealthResponse(BaseModel):
 
 class GAQLSearchRequest(BaseModel):
     """GAQL search request."""
+    model_config = MODEL_CONFIG
+
     query: str = Field(..., description="GAQL query string")
     client_id: str = Field(..., description="Google Ads customer ID")
     page_size: int = Field(1000, ge=1, le=10000, description="Results per page")
@@ -155,10 +238,24 @@ class GAQLSearchRequest(BaseModel):
     cache_enabled: bool = Field(True, description="Enable caching")
     service_type: str = Field("reporting", description="Service type for TTL")
 
+    # Cache TTL for service_type, resolved once at parse time
+    _cache_ttl: int = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        """Resolve the service type name to its TTL."""
+        self._cache_ttl = ServiceTTL.resolve(self.service_type)
+
+    @property
+    def cache_ttl(self) -> int:
+        """Cache TTL (seconds) for this request's service type."""
+        return self._cache_ttl
+
 
 class MutateOperationRequest(BaseModel):
     """Mutate operation request."""
-    operations: List[Dict[str, Any]] = Field(..., description="List of operations")
+    model_config = MODEL_CONFIG
+
+    operations: List[dict] = Field(..., description="List of operations")
     client_id: str = Field(..., description="Google Ads customer ID")
     operation_type: str = Field(..., description="Operation type (campaign, ad_group, etc.)")
     urgency: int = Field(70, ge=0, le=99, description="Operation urgency")
@@ -167,27 +264,37 @@ class MutateOperationRequest(BaseModel):
 
 class SetTierRequest(BaseModel):
     """Set client tier request."""
+    model_config = MODEL_CONFIG
+
     tier: SLATier = Field(..., description="SLA tier")
 
 
 class SetQuotaRequest(BaseModel):
     """Set client quota request."""
+    model_config = MODEL_CONFIG
+
     quota: int = Field(..., ge=0, description="Quota amount")
 
 
 class ResetGlobalQuotaRequest(BaseModel):
     """Reset global quota request."""
+    model_config = MODEL_CONFIG
+
     global_daily: int = Field(..., ge=0, description="Global daily quota")
 
 
 class TokenRequest(BaseModel):
     """Token creation request (dev only)."""
+    model_config = MODEL_CONFIG
+
     user_id: str = Field(..., description="User ID")
     role: Role = Field(..., description="User role")
 
 
 class ErrorResponse(BaseModel):
     """Error response."""
+    model_config = MODEL_CONFIG
+
     category: str
     code: str
     message: str
@@ -200,34 +307,39 @@ class ErrorResponse(BaseModel):
 async def ads_api_error_handler(request, exc: AdsAPIError):
     """Handle AdsAPIError exceptions."""
     return JSONResponse(
-        status_code=exc.error_detail.http_status,
-        content=exc.error_detail.to_dict(),
+        status_code=exc.http_status,
+        content=exc.to_dict(),
     )
 
 
 # Health check endpoints
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check():
+async def health_check(
+    redis_client: redis.Redis = Depends(get_redis),
+    scheduler: PriorityScheduler = Depends(get_scheduler),
+):
     """
     Health check endpoint.
 
     Returns overall health status and component statuses.
     """
-    redis_healthy = False
-    scheduler_healthy = False
+    # Run both probes concurrently; a stuck Redis can't stall liveness
+    ping_result, scheduler_result = await asyncio.gather(
+        asyncio.wait_for(redis_client.ping(), timeout=HEALTH_CHECK_TIMEOUT),
+        scheduler.health_check(),
+        return_exceptions=True,
+    )
 
-    try:
-        await app_state["redis"].ping()
-        redis_healthy = True
-    except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
+    redis_healthy = not isinstance(ping_result, BaseException)
+    if not redis_healthy:
+        logger.error(f"Redis health check failed: {ping_result!r}")
 
-    try:
-        health_info = await app_state["scheduler"].health_check()
-        scheduler_healthy = health_info["healthy"]
-    except Exception as e:
-        logger.error(f"Scheduler health check failed: {e}")
+    scheduler_healthy = False
+    if isinstance(scheduler_result, BaseException):
+        logger.error(f"Scheduler health check failed: {scheduler_result}")
+    else:
+        scheduler_healthy = scheduler_result["healthy"]
 
     overall_healthy = redis_healthy and scheduler_healthy
 
@@ -242,11 +354,16 @@ async def health_check():
 
 
 @app.get("/health/ready", tags=["Health"])
-async def readiness_check():
+async def readiness_check(
+    redis_client: redis.Redis = Depends(get_redis),
+    scheduler: PriorityScheduler = Depends(get_scheduler),
+):
     """Readiness check for Kubernetes/load balancers."""
     try:
-        await app_state["redis"].ping()
-        scheduler_health = await app_state["scheduler"].health_check()
+        _, scheduler_health = await asyncio.gather(
+            asyncio.wait_for(redis_client.ping(), timeout=HEALTH_CHECK_TIMEOUT),
+            scheduler.health_check(),
+        )
         if scheduler_health["healthy"]:
             return {"status": "ready"}
     except Exception:
@@ -261,20 +378,19 @@ async def readiness_check():
 async def execute_gaql_search(
     request: GAQLSearchRequest,
     token: TokenData = Depends(get_current_user),
+    ads_manager: GoogleAdsManager = Depends(get_ads_manager),
 ):
     """
     Execute GAQL search query.
 
     Requires VIEWER role or higher.
     """
-    ads_manager: GoogleAdsManager = app_state["ads_manager"]
-
     gaql_request = GAQLRequest(
         query=request.query,
         client_id=request.client_id,
         page_size=request.page_size,
         cache_enabled=request.cache_enabled,
-        service_type=request.service_type,
+        service_type=request.cache_ttl,
     )
 
     result = await ads_manager.execute_gaql(gaql_request, urgency=request.urgency)
@@ -291,14 +407,13 @@ async def execute_gaql_search(
 async def execute_mutate(
     request: MutateOperationRequest,
     token: TokenData = Depends(get_current_user),
+    ads_manager: GoogleAdsManager = Depends(get_ads_manager),
 ):
     """
     Execute mutate operation (create/update/delete).
 
     Requires OPS role or higher.
     """
-    ads_manager: GoogleAdsManager = app_state["ads_manager"]
-
     mutate_request = MutateRequest(
         operations=request.operations,
         client_id=request.client_id,
@@ -319,13 +434,16 @@ async def execute_mutate(
 # Admin API endpoints
 
 @app.post("/admin/clients/{client_id}/tier", tags=["Admin"], dependencies=[Depends(require_admin)])
-async def set_client_tier(client_id: str, request: SetTierRequest):
+async def set_client_tier(
+    client_id: str,
+    request: SetTierRequest,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Set SLA tier for a client.
 
     Requires ADMIN role.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     await quota_governor.set_client_tier(client_id, request.tier)
 
     return {
@@ -336,13 +454,16 @@ async def set_client_tier(client_id: str, request: SetTierRequest):
 
 
 @app.post("/admin/clients/{client_id}/quota", tags=["Admin"], dependencies=[Depends(require_admin)])
-async def set_client_quota(client_id: str, request: SetQuotaRequest):
+async def set_client_quota(
+    client_id: str,
+    request: SetQuotaRequest,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Set quota for a specific client.
 
     Requires ADMIN role.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     await quota_governor.set_client_quota(client_id, request.quota)
 
     return {
@@ -353,13 +474,15 @@ async def set_client_quota(client_id: str, request: SetQuotaRequest):
 
 
 @app.post("/admin/quota/reset", tags=["Admin"], dependencies=[Depends(require_admin)])
-async def reset_global_quota(request: ResetGlobalQuotaRequest):
+async def reset_global_quota(
+    request: ResetGlobalQuotaRequest,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Reset global daily quota.
 
     Requires ADMIN role.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     await quota_governor.reset_global_quota(request.global_daily)
 
     return {
@@ -369,13 +492,15 @@ async def reset_global_quota(request: ResetGlobalQuotaRequest):
 
 
 @app.post("/admin/clients/{client_id}/pause", tags=["Admin"], dependencies=[Depends(require_admin)])
-async def pause_client(client_id: str):
+async def pause_client(
+    client_id: str,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Pause a client (no operations allowed).
 
     Requires ADMIN role.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     await quota_governor.pause_client(client_id)
 
     return {
@@ -385,13 +510,15 @@ async def pause_client(client_id: str):
 
 
 @app.post("/admin/clients/{client_id}/resume", tags=["Admin"], dependencies=[Depends(require_admin)])
-async def resume_client(client_id: str):
+async def resume_client(
+    client_id: str,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Resume a paused client.
 
     Requires ADMIN role.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     await quota_governor.resume_client(client_id)
 
     return {
@@ -401,41 +528,45 @@ async def resume_client(client_id: str):
 
 
 @app.get("/admin/quota/status", tags=["Admin"], dependencies=[Depends(require_ops)])
-async def get_quota_status():
+async def get_quota_status(
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Get current global quota status.
 
     Requires OPS role or higher.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     status_info = await quota_governor.get_quota_status()
 
     return status_info
 
 
 @app.get("/admin/clients/{client_id}/status", tags=["Admin"], dependencies=[Depends(require_ops)])
-async def get_client_status(client_id: str):
+async def get_client_status(
+    client_id: str,
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Get status for a specific client.
 
     Requires OPS role or higher.
     """
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
     status_info = await quota_governor.get_client_quota_status(client_id)
 
     return status_info
 
 
 @app.get("/admin/stats", tags=["Admin"], dependencies=[Depends(require_ops)])
-async def get_system_stats():
+async def get_system_stats(
+    cache_manager: CacheManager = Depends(get_cache_manager),
+    scheduler: PriorityScheduler = Depends(get_scheduler),
+    quota_governor: QuotaGovernor = Depends(get_quota_governor),
+):
     """
     Get system statistics (cache, scheduler, quota).
 
     Requires OPS role or higher.
     """
-    cache_manager: CacheManager = app_state["cache_manager"]
-    scheduler: PriorityScheduler = app_state["scheduler"]
-    quota_governor: QuotaGovernor = app_state["quota_governor"]
 
     cache_stats = cache_manager.get_stats()
     scheduler_stats = scheduler.get_stats()
@@ -474,10 +605,19 @@ async def create_dev_token(request: TokenRequest):
 if __name__ == "__main__":
     import uvicorn
 
+    workers = int(os.getenv("APP_WORKERS", "1"))
+    limit_concurrency = os.getenv("APP_LIMIT_CONCURRENCY")
+
     uvicorn.run(
         "api_server:app",
         host=os.getenv("APP_HOST", "0.0.0.0"),
         port=int(os.getenv("APP_PORT", "8000")),
-        workers=1,  # Use 1 for development (lifespan doesn't work well with >1 in dev)
-        reload=True,
+        # "auto" picks uvloop/httptools where installed and supported (not on Windows)
+        loop="auto",
+        http="auto",
+        workers=workers,
+        # Reload only applies to a single dev process (uvicorn ignores workers with it)
+        reload=workers == 1 and os.getenv("APP_ENV", "development") == "development",
+        backlog=int(os.getenv("APP_BACKLOG", "2048")),
+        limit_concurrency=int(limit_concurrency) if limit_concurrency else None,
     )
@@ -14,7 +14,7 @@ from core.errors import (
     ExternalAPIError,
     InternalError,
 )
-from core.cache import LRUCache, CacheManager, TTL_BY_SERVICE
+from core.cache import LRUCache, CacheManager, ServiceTTL, TTL_BY_SERVICE
 from core.quota import QuotaGovernor, SLATier
 from core.scheduler import PriorityScheduler, Operation
 from core.google_ads_manager import (
@@ -41,6 +41,7 @@ __all__ = [
     # Cache
     "LRUCache",
     "CacheManager",
+    "ServiceTTL",
     "TTL_BY_SERVICE",
     # Quota
     "QuotaGovernor",
@@ -4,32 +4,146 @@
 Provides fast in-memory caching with Redis fallback for distributed scenarios.
 """
 
-import json
-import time
-from collections import OrderedDict
-from typing import Optional, Any, Dict
+import asyncio
+import hashlib
+import sys
+import threading
+import heapq
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Tuple, Union
 from dataclasses import dataclass
+from enum import IntEnum
 import logging
 
+import orjson
 import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
 
 
 # TTL policy by service type (in seconds)
+class ServiceTTL(IntEnum):
+    """Cache TTL per service type; members are plain ints usable as TTLs."""
+
+    REPORTING = 300      # 5 min
+    CAMPAIGN = 1800      # 30 min
+    KEYWORD = 900        # 15 min
+    BUDGET = 3600        # 1 hour
+    CUSTOMER = 86400     # 1 day
+
+    @classmethod
+    def resolve(cls, service_type: Union[str, int]) -> int:
+        """
+        Map a service type name (or already-resolved TTL) to its TTL.
+
+        Unknown names (and "default") fall back to DEFAULT_TTL.
+
+        Raises:
+            ValueError: For an int that is not a known TTL, or a value that is
+                neither str nor int (so request validation reports a 422)
+        """
+        if isinstance(service_type, int):
+            return cls(service_type)
+        if not isinstance(service_type, str):
+            raise ValueError(f"service_type must be a string, got {type(service_type).__name__}")
+        return TTL_BY_SERVICE.get(service_type.lower(), DEFAULT_TTL)
+
+
+# TTL for unknown service types; kept out of ServiceTTL, where a member equal
+# to REPORTING's value would just be an alias of it
+DEFAULT_TTL = 300  # 5 min
+
 TTL_BY_SERVICE: Dict[str, int] = {
-    'reporting': 300,      # 5 min
-    'campaign': 1800,      # 30 min
-    'keyword': 900,        # 15 min
-    'budget': 3600,        # 1 hour
-    'customer': 86400,     # 1 day
-    'default': 300,        # 5 min
+    **{name.lower(): ttl for name, ttl in ServiceTTL.__members__.items()},
+    "default": DEFAULT_TTL,
 }
 
+# LRU partitioning: up to LRU_SHARDS lock-protected shards, never smaller than
+# MIN_SHARD_SIZE entries each (small caches fall back to a single shard)
+LRU_SHARDS = 16
+MIN_SHARD_SIZE = 64
+
+# LRU-SP eviction: when a shard is full, evict its EVICTION_FRACTION (at least
+# one entry) with the highest cost = idle_time * size / hits, where idle time
+# is counted in shard accesses (a generation counter) rather than wall clock
+EVICTION_FRACTION = 0.05
+
+_MISSING = object()
+
+# Payloads at least this large are (de)serialized in a worker thread so a
+# multi-MB GAQL result doesn't stall the event loop; smaller ones stay inline
+OFFLOAD_MIN_ITEMS = 1_000
+OFFLOAD_MIN_BYTES = 256_000
+
+# Background Redis writes: flush every WRITE_FLUSH_INTERVAL seconds or
+# WRITE_BATCH_SIZE queued writes, whichever comes first
+WRITE_BATCH_SIZE = 256
+WRITE_FLUSH_INTERVAL = 0.005
+WRITE_QUEUE_MAXSIZE = 100_000
+
+# TTL for empty results so repeated misses don't stampede the upstream API
+NEGATIVE_CACHE_TTL = 30
+
+# Marker parked in Redis by the process loading a key (SET NX GET); it expires
+# after LOAD_CLAIM_TTL seconds if the loader never writes a value. JSON
+# payloads never start with a NUL byte, so it can't collide with real data.
+LOAD_CLAIM_TTL = 10
+_LOADING = b"\x00loading"
+
+# One SCAN page plus UNLINK of its keys per call, so a pattern clear costs one
+# round-trip per page and never blocks Redis for a whole keyspace walk.
+# ARGV: cursor, pattern. Returns {next cursor, keys unlinked}.
+CLEAR_PATTERN_PAGE_LUA = """
+local result = redis.call("SCAN", ARGV[1], "MATCH", ARGV[2], "COUNT", 500)
+local keys = result[2]
+local deleted = 0
+if #keys > 0 then
+    deleted = redis.call("UNLINK", unpack(keys))
+end
+return {result[1], deleted}
+"""
+
+
+def _serialize(value: Any) -> bytes:
+    """Serialize a cache value to JSON bytes (non-str dict keys allowed, as with json)."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def _serialize_async(value: Any) -> bytes:
+    """Serialize a cache value, in a worker thread if it looks large."""
+    if isinstance(value, (list, dict)) and len(value) >= OFFLOAD_MIN_ITEMS:
+        return await asyncio.to_thread(_serialize, value)
+    return _serialize(value)
+
+
+async def _deserialize_async(payload: bytes) -> Any:
+    """Deserialize a cached payload, in a worker thread if it is large."""
+    if len(payload) >= OFFLOAD_MIN_BYTES:
+        return await asyncio.to_thread(orjson.loads, payload)
+    return orjson.loads(payload)
+
 
-@dataclass
+def memoize(maxsize: Optional[int] = 128) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Memoize a pure function with the C-implemented functools.lru_cache.
+
+    Prefer this over LRUCache when the cache key is just the call
+    arguments: lookups skip LRUCache's Python-level locking and bookkeeping.
+    Use LRUCache for values set, read and deleted explicitly.
+
+    Args:
+        maxsize: Maximum number of cached calls (None for unbounded)
+
+    Returns:
+        Decorator; wrapped functions expose cache_info() and cache_clear()
+    """
+    return lru_cache(maxsize=maxsize)
+
+
+@dataclass(slots=True, frozen=True)
 class CacheStats:
-    """Cache statistics for monitoring."""
+    """Cache statistics for monitoring (an immutable snapshot)."""
 
     hits: int = 0
     misses: int = 0
@@ -53,8 +167,81 @@ class CacheStats:
         }
 
 
+class _LRUEntry:
+    """Cached value with the bookkeeping used for LRU-SP eviction."""
+
+    __slots__ = ("value", "hits", "last_access", "size")
+
+    def __init__(self, value: Any, now: int):
+        self.value = value
+        self.hits = 0
+        self.last_access = now
+        self.size = sys.getsizeof(value)
+
+
+class _LRUShard:
+    """One lock-protected partition of an LRUCache."""
+
+    __slots__ = (
+        "maxsize", "evict_batch", "cache", "gen", "lock", "hits", "misses", "sets", "evictions",
+    )
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize LRU shard.
+
+        Args:
+            maxsize: Maximum number of entries in this shard
+        """
+        self.maxsize = maxsize
+        self.evict_batch = max(1, int(maxsize * EVICTION_FRACTION))
+        self.cache: Dict[str, _LRUEntry] = {}
+        self.gen = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+    def evict(self) -> List[str]:
+        """
+        Evict a batch of entries using the LRU-SP rule (caller holds the lock).
+
+        One sweep over the shard picks the evict_batch most expensive
+        entries, so the sweep cost is amortized over that many inserts and
+        frequently hit entries survive one-off scans.
+
+        Returns:
+            Evicted keys
+        """
+        now = self.gen
+        cache = self.cache
+        # LRU-SP cost: idle time * size / number of references (inlined, hot)
+        victims = heapq.nlargest(
+            self.evict_batch,
+            cache.items(),
+            key=lambda item: (now - item[1].last_access) * item[1].size / (item[1].hits or 1),
+        )
+        for key, _ in victims:
+            del cache[key]
+        self.evictions += len(victims)
+        return [key for key, _ in victims]
+
+
 class LRUCache:
-    """Simple in-process LRU cache with metrics."""
+    """
+    In-process LRU cache with metrics.
+
+    Eviction follows LRU-SP: a full shard drops its most expensive entries
+    in one batch, weighing idle time and size against hit count, so a
+    one-off scan does not flush frequently used entries. Recency is a
+    per-shard generation counter on each entry, so a hit only bumps two
+    integers and never reorders the backing dict.
+    Entries are partitioned across up to LRU_SHARDS shards by key hash, each
+    with its own lock, so the cache is safe to use from worker threads
+    (e.g. asyncio.to_thread) with little lock contention. Small caches use a
+    single shard so eviction decisions see every entry.
+    """
 
     def __init__(self, maxsize: int = 10_000):
         """
@@ -64,8 +251,22 @@ class LRUCache:
             maxsize: Maximum number of entries to cache
         """
         self.maxsize = maxsize
-        self.cache: OrderedDict[str, Any] = OrderedDict()
-        self.stats = CacheStats()
+
+        # Largest power-of-two shard count that keeps shards reasonably sized
+        shard_count = LRU_SHARDS
+        while shard_count > 1 and maxsize // shard_count < MIN_SHARD_SIZE:
+            shard_count //= 2
+
+        # Spread capacity so shard sizes add up to maxsize exactly
+        base, extra = divmod(maxsize, shard_count)
+        self._shards = [
+            _LRUShard(base + (1 if i < extra else 0)) for i in range(shard_count)
+        ]
+        self._mask = shard_count - 1
+
+    def _shard(self, key: str) -> _LRUShard:
+        """Get the shard owning a key."""
+        return self._shards[hash(key) & self._mask]
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -77,15 +278,19 @@ class LRUCache:
         Returns:
             Cached value or None if not found
         """
-        value = self.cache.get(key)
-        if value is not None:
-            self.cache.move_to_end(key)
-            self.stats.hits += 1
-            logger.debug(f"LRU cache hit: {key}")
-            return value
-
-        self.stats.misses += 1
-        logger.debug(f"LRU cache miss: {key}")
+        shard = self._shards[hash(key) & self._mask]
+        with shard.lock:
+            cache = shard.cache
+            entry = cache.get(key)
+            if entry is not None:
+                shard.gen += 1
+                entry.hits += 1
+                entry.last_access = shard.gen
+                shard.hits += 1
+                return entry.value
+            shard.misses += 1
+
+        logger.debug("LRU cache miss: %s", key)
         return None
 
     def set(self, key: str, value: Any) -> None:
@@ -96,17 +301,27 @@ class LRUCache:
             key: Cache key
             value: Value to cache
         """
-        # Update existing or add new
-        self.cache[key] = value
-        self.cache.move_to_end(key)
-
-        # Evict if over limit (only for new keys)
-        if len(self.cache) > self.maxsize:
-            evicted_key = self.cache.popitem(last=False)
-            self.stats.evictions += 1
-            logger.debug(f"LRU cache eviction: {evicted_key[0]}")
-
-        self.stats.sets += 1
+        shard = self._shards[hash(key) & self._mask]
+        evicted = None
+        with shard.lock:
+            cache = shard.cache
+            shard.gen += 1
+            entry = cache.get(key)
+            if entry is not None:
+                # Update existing: refresh value and recency, keep hit count
+                entry.value = value
+                entry.size = sys.getsizeof(value)
+                entry.last_access = shard.gen
+            else:
+                # Make room first so the new key is never its own victim
+                if cache and len(cache) >= shard.maxsize:
+                    evicted = shard.evict()
+                cache[key] = _LRUEntry(value, shard.gen)
+
+            shard.sets += 1
+
+        if evicted:
+            logger.debug("LRU cache evicted %d entries", len(evicted))
 
     def delete(self, key: str) -> bool:
         """
@@ -118,23 +333,30 @@ class LRUCache:
         Returns:
             True if key was deleted, False if not found
         """
-        if key in self.cache:
-            del self.cache[key]
-            return True
-        return False
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.cache.pop(key, _MISSING) is not _MISSING
 
     def clear(self) -> None:
         """Clear all cache entries."""
-        self.cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.cache.clear()
         logger.info("LRU cache cleared")
 
     def size(self) -> int:
         """Get current cache size."""
-        return len(self.cache)
+        return sum(len(shard.cache) for shard in self._shards)
 
     def get_stats(self) -> CacheStats:
-        """Get cache statistics."""
-        return self.stats
+        """Get cache statistics (summed across shards)."""
+        hits = misses = sets = evictions = 0
+        for shard in self._shards:
+            hits += shard.hits
+            misses += shard.misses
+            sets += shard.sets
+            evictions += shard.evictions
+        return CacheStats(hits, misses, sets, evictions)
 
 
 class CacheManager:
@@ -142,6 +364,9 @@ class CacheManager:
     2-tier cache manager: LRU + Redis.
 
     Provides unified interface for both in-memory and distributed caching.
+    Writes update the LRU immediately and reach Redis through a background
+    flusher that pipelines queued SETEX commands, so callers never wait on
+    a Redis round-trip to store a value (Redis is eventually consistent).
     """
 
     def __init__(
@@ -158,8 +383,35 @@ class CacheManager:
         """
         self.redis = redis_client
         self.hot_cache = LRUCache(maxsize=lru_maxsize)
+        self._clear_script = redis_client.register_script(CLEAR_PATTERN_PAGE_LUA)
+        self._inflight: Dict[str, asyncio.Future[Any]] = {}
+        self._write_queue: Optional[asyncio.Queue[Tuple[str, int, bytes, int]]] = None
+        self._flusher: Optional[asyncio.Task[None]] = None
+        # Writes are numbered as queued; delete()/clear_pattern() leave a
+        # tombstone so the flusher drops queued writes numbered up to it
+        self._write_seq = 0
+        self._flushed_seq = 0
+        self._tombstones: Dict[str, int] = {}
+        self._pattern_tombstones: List[Tuple[str, int]] = []
+        # Pipeline currently being sent by the flusher
+        self._batch_write: Optional[asyncio.Future[Any]] = None
         logger.info(f"CacheManager initialized (LRU size: {lru_maxsize})")
 
+    def peek(self, cache_key: str) -> Optional[Any]:
+        """
+        Get value from the in-process LRU only, without awaiting.
+
+        Lets hot callers skip creating a coroutine when the value is already
+        in memory; fall back to get()/get_or_compute() on None.
+
+        Args:
+            cache_key: Cache key
+
+        Returns:
+            Cached value or None
+        """
+        return self.hot_cache.get(cache_key)
+
     async def get(self, cache_key: str, service_type: str = "default") -> Optional[Any]:
         """
         Get value from cache (checks LRU first, then Redis).
@@ -175,51 +427,304 @@ class CacheManager:
         result = self.hot_cache.get(cache_key)
         if result is not None:
             return result
+        return await self._get_remote(cache_key)
 
-        # Try Redis
+    async def _get_remote(self, cache_key: str) -> Optional[Any]:
+        """Get value from Redis, promoting it to the LRU on a hit."""
         try:
             cached = await self.redis.get(f"cache:{cache_key}")
-            if cached:
-                data = json.loads(cached)
-                # Promote to LRU
-                self.hot_cache.set(cache_key, data)
-                logger.debug(f"Redis cache hit (promoted to LRU): {cache_key}")
+            if cached and cached != _LOADING:
+                data = await _deserialize_async(cached)
+                # Promote to LRU (not empty values: they may be negative
+                # entries, which only Redis expires)
+                if data:
+                    self.hot_cache.set(cache_key, data)
+                logger.debug(f"Redis cache hit: {cache_key}")
                 return data
         except Exception as e:
             logger.error(f"Redis get error for key {cache_key}: {e}")
 
         return None
 
+    async def _claim_remote(self, cache_key: str) -> Optional[Any]:
+        """
+        Get value from Redis, or claim the key for loading in the same round-trip.
+
+        SET NX GET (Redis >= 7.0) returns the stored payload if there is one,
+        otherwise parks the _LOADING marker until the loaded value replaces it.
+
+        Args:
+            cache_key: Cache key
+
+        Returns:
+            Cached value, or None if the caller should load it
+        """
+        try:
+            cached = await self.redis.set(
+                f"cache:{cache_key}", _LOADING, ex=LOAD_CLAIM_TTL, nx=True, get=True
+            )
+            if cached and cached != _LOADING:
+                data = await _deserialize_async(cached)
+                if data:
+                    self.hot_cache.set(cache_key, data)
+                logger.debug(f"Redis cache hit: {cache_key}")
+                return data
+        except Exception as e:
+            logger.error(f"Redis claim error for key {cache_key}: {e}")
+
+        return None
+
     async def set(
         self,
         cache_key: str,
         value: Any,
-        service_type: str = "default",
+        service_type: Union[str, ServiceTTL] = "default",
         ttl: Optional[int] = None
     ) -> None:
         """
-        Set value in cache (both LRU and Redis).
+        Set value in cache (LRU now, Redis via the background flusher).
 
         Args:
             cache_key: Cache key
             value: Value to cache
-            service_type: Service type for TTL mapping
+            service_type: Service type name or resolved ServiceTTL
             ttl: Optional explicit TTL (overrides service type TTL)
         """
-        # Determine TTL
-        cache_ttl = ttl if ttl is not None else TTL_BY_SERVICE.get(service_type, 300)
+        # Determine TTL (a ServiceTTL resolved at request parse time is the TTL itself)
+        if ttl is not None:
+            cache_ttl = ttl
+        elif isinstance(service_type, int):
+            cache_ttl = service_type
+        else:
+            cache_ttl = TTL_BY_SERVICE.get(service_type, DEFAULT_TTL)
 
         # Set in LRU
         self.hot_cache.set(cache_key, value)
 
-        # Set in Redis with TTL
+        # Queue Redis write with TTL
         try:
-            payload = json.dumps(value)
-            await self.redis.setex(f"cache:{cache_key}", cache_ttl, payload)
-            logger.debug(f"Cached in LRU+Redis: {cache_key} (TTL: {cache_ttl}s)")
+            payload = await _serialize_async(value)
+            self._enqueue_write(cache_key, cache_ttl, payload)
         except Exception as e:
             logger.error(f"Redis set error for key {cache_key}: {e}")
 
+    async def get_or_compute(
+        self,
+        cache_key: str,
+        loader: Callable[[], Awaitable[Any]],
+        service_type: Union[str, ServiceTTL] = "default",
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Get value from cache, computing and caching it on a miss.
+
+        Concurrent misses for the same key share a single loader call
+        (single-flight). Empty results are cached in Redis only, for
+        NEGATIVE_CACHE_TTL seconds, so repeated misses do not hit the upstream
+        API; the LRU has no expiry, so they are never kept there.
+
+        Args:
+            cache_key: Cache key
+            loader: Coroutine function producing the value on a miss
+            service_type: Service type name or resolved ServiceTTL
+            ttl: Optional explicit TTL (overrides service type TTL)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        # Try LRU first
+        result = self.hot_cache.get(cache_key)
+        if result is not None:
+            return result
+        return await self.fill(cache_key, loader, service_type, ttl)
+
+    async def fill(
+        self,
+        cache_key: str,
+        loader: Callable[[], Awaitable[Any]],
+        service_type: Union[str, ServiceTTL] = "default",
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Resolve a key that already missed the LRU (see peek()).
+
+        Checks Redis, then calls the loader, with the same single-flight and
+        negative caching behavior as get_or_compute(). The Redis check also
+        claims the key (see _claim_remote), so a cold key costs one Redis
+        round-trip before loading; other processes that find the claim
+        treat it as a miss.
+
+        Args:
+            cache_key: Cache key
+            loader: Coroutine function producing the value on a miss
+            service_type: Service type name or resolved ServiceTTL
+            ttl: Optional explicit TTL (overrides service type TTL)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        # Join a load already in flight for this key
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            logger.debug(f"Joining in-flight load: {cache_key}")
+            return await asyncio.shield(inflight)
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            result = await self._claim_remote(cache_key)
+            if result is None:
+                result = await loader()
+                if result:
+                    await self.set(cache_key, result, service_type=service_type, ttl=ttl)
+                elif result is not None:
+                    # Negative entry: Redis only, where the TTL bounds its life
+                    try:
+                        self._enqueue_write(
+                            cache_key, NEGATIVE_CACHE_TTL, await _serialize_async(result)
+                        )
+                    except Exception as e:
+                        logger.error(f"Redis set error for key {cache_key}: {e}")
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters (if any) re-raise it; don't log it as never retrieved
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[cache_key]
+
+    def _enqueue_write(self, cache_key: str, ttl: int, payload: bytes) -> None:
+        """
+        Queue a Redis SETEX for the background flusher (started on first use).
+
+        Args:
+            cache_key: Cache key
+            ttl: TTL in seconds
+            payload: Serialized value
+        """
+        queue = self._write_queue
+        if queue is None or self._flusher is None or self._flusher.done():
+            queue = self._write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE)
+            self._flusher = asyncio.create_task(self._flush_loop(queue))
+
+        seq = self._write_seq + 1
+        try:
+            queue.put_nowait((cache_key, ttl, payload, seq))
+        except asyncio.QueueFull:
+            # Cache writes are best-effort; the value is still in the LRU
+            logger.warning(f"Redis write queue full, dropping write for key {cache_key}")
+            return
+        self._write_seq = seq
+
+    def _tombstoned(self, cache_key: str, seq: int) -> bool:
+        """Whether a queued write was superseded by a later delete/clear_pattern."""
+        if self._tombstones.get(cache_key, 0) >= seq:
+            return True
+        redis_key = f"cache:{cache_key}"
+        return any(
+            seq <= until and fnmatchcase(redis_key, pattern)
+            for pattern, until in self._pattern_tombstones
+        )
+
+    async def _drop_queued_writes(
+        self, cache_key: Optional[str] = None, pattern: Optional[str] = None
+    ) -> None:
+        """
+        Keep queued writes from resurrecting a key (or pattern) being deleted.
+
+        Writes still queued are skipped by the flusher; only a pipeline
+        already on the wire is awaited, never the whole queue, so a delete
+        can't stall behind sustained set() traffic.
+
+        Args:
+            cache_key: Cache key being deleted
+            pattern: Redis key pattern being cleared
+        """
+        if self._write_seq != self._flushed_seq:
+            if cache_key is not None:
+                self._tombstones[cache_key] = self._write_seq
+            if pattern is not None:
+                self._pattern_tombstones.append((pattern, self._write_seq))
+
+        batch_write = self._batch_write
+        if batch_write is not None and not batch_write.done():
+            await asyncio.wait([batch_write])
+
+    async def _flush_loop(self, queue: "asyncio.Queue[Tuple[str, int, bytes, int]]") -> None:
+        """
+        Background task pipelining queued writes to Redis.
+
+        A batch is flushed once WRITE_BATCH_SIZE writes are queued or
+        WRITE_FLUSH_INTERVAL has passed since its first write.
+
+        Args:
+            queue: Write queue to drain
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + WRITE_FLUSH_INTERVAL
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                if self._tombstones or self._pattern_tombstones:
+                    live = [item for item in batch if not self._tombstoned(item[0], item[3])]
+                else:
+                    live = batch
+                if live:
+                    pipe = self.redis.pipeline(transaction=False)
+                    for cache_key, ttl, payload, _ in live:
+                        pipe.setex(f"cache:{cache_key}", ttl, payload)
+                    self._batch_write = asyncio.ensure_future(pipe.execute())
+                    await self._batch_write
+                    logger.debug(f"Flushed {len(live)} cache writes to Redis")
+            except Exception as e:
+                logger.error(f"Redis flush error for {len(batch)} keys: {e}")
+            finally:
+                # Writes leave the queue in order, so tombstones up to the last
+                # seq handled here can no longer match anything
+                flushed = self._flushed_seq = batch[-1][3]
+                if self._tombstones:
+                    self._tombstones = {
+                        key: until for key, until in self._tombstones.items() if until > flushed
+                    }
+                if self._pattern_tombstones:
+                    self._pattern_tombstones = [
+                        entry for entry in self._pattern_tombstones if entry[1] > flushed
+                    ]
+                for _ in batch:
+                    queue.task_done()
+
+    async def flush(self) -> None:
+        """Wait until every queued Redis write has been sent."""
+        if self._write_queue is not None and self._flusher is not None:
+            await self._write_queue.join()
+
+    async def close(self) -> None:
+        """Flush queued Redis writes and stop the background flusher."""
+        await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
     async def delete(self, cache_key: str) -> None:
         """
         Delete key from both LRU and Redis.
@@ -230,6 +735,9 @@ class CacheManager:
         # Delete from LRU
         self.hot_cache.delete(cache_key)
 
+        # Don't let a queued write resurrect the key afterwards
+        await self._drop_queued_writes(cache_key=cache_key)
+
         # Delete from Redis
         try:
             await self.redis.delete(f"cache:{cache_key}")
@@ -241,25 +749,32 @@ class CacheManager:
         """
         Clear all keys matching a pattern from Redis.
 
+        Each SCAN page is matched and unlinked by one script call, so Redis
+        is only ever blocked for a single page.
+
         Args:
             pattern: Redis key pattern (e.g., "cache:client:123:*")
 
         Returns:
             Number of keys deleted
         """
+        # Don't let queued writes resurrect matching keys afterwards
+        await self._drop_queued_writes(pattern=pattern)
+
+        deleted = 0
+        cursor: Any = 0
         try:
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
-
-            if keys:
-                deleted = await self.redis.delete(*keys)
-                logger.info(f"Cleared {deleted} keys matching pattern: {pattern}")
-                return deleted
+            while True:
+                cursor, unlinked = await self._clear_script(keys=[], args=[cursor, pattern])
+                deleted += int(unlinked)
+                if int(cursor) == 0:
+                    break
         except Exception as e:
             logger.error(f"Redis clear pattern error for {pattern}: {e}")
 
-        return 0
+        if deleted:
+            logger.info(f"Cleared {deleted} keys matching pattern: {pattern}")
+        return deleted
 
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -275,8 +790,8 @@ class CacheManager:
             "lru_maxsize": self.hot_cache.maxsize,
         }
 
+    @staticmethod
     def build_cache_key(
-        self,
         client_id: str,
         operation: str,
         **params: Any
@@ -284,6 +799,10 @@ class CacheManager:
         """
         Build a standardized cache key.
 
+        Params are folded into a fixed-length 64-bit digest so keys stay short
+        regardless of query size; the client/operation prefix is kept readable
+        for pattern invalidation.
+
         Args:
             client_id: Client ID
             operation: Operation name
@@ -292,8 +811,11 @@ class CacheManager:
         Returns:
             Standardized cache key
         """
+        if not params:
+            return f"client:{client_id}:{operation}"
+
         # Sort params for consistency
-        param_str = ":".join(f"{k}={v}" for k, v in sorted(params.items()))
-        if param_str:
-            return f"client:{client_id}:{operation}:{param_str}"
-        return f"client:{client_id}:{operation}"
+        digest = hashlib.blake2b(digest_size=8)
+        for k in sorted(params):
+            digest.update(f"{k}={params[k]!r}|".encode())
+        return f"client:{client_id}:{operation}:{digest.hexdigest()}"
@@ -5,8 +5,8 @@ Provides typed errors and HTTP status code mapping for all error scenarios.
 """
 
 from enum import Enum
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, Optional
+from dataclasses import dataclass, field
 
 
 class ErrorCategory(str, Enum):
@@ -25,7 +25,7 @@ class ErrorCategory(str, Enum):
     CIRCUIT_BREAKER = "circuit_breaker"
 
 
-@dataclass
+@dataclass(slots=True)
 class ErrorDetail:
     """Detailed error information."""
 
@@ -35,197 +35,222 @@ class ErrorDetail:
     http_status: int
     retryable: bool
     details: Optional[Dict[str, Any]] = None
+    _dict: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for API response."""
-        result = {
-            "category": self.category.value,
-            "code": self.code,
-            "message": self.message,
-            "retryable": self.retryable,
-        }
-        if self.details:
-            result["details"] = self.details
+        """Convert to dictionary for API response (built once, then reused)."""
+        result = self._dict
+        if result is None:
+            result = {
+                "category": self.category.value,
+                "code": self.code,
+                "message": self.message,
+                "retryable": self.retryable,
+            }
+            if self.details:
+                result["details"] = self.details
+            self._dict = result
         return result
 
 
 class AdsAPIError(Exception):
-    """Base exception for all Ads API errors."""
+    """
+    Base exception for all Ads API errors.
+
+    Subclasses describe themselves with *_default class attributes; the
+    constructor reads those, so most subclasses need no __init__ of their own.
+    """
+
+    message_default: ClassVar[str] = "Internal server error"
+    category_default: ClassVar[ErrorCategory] = ErrorCategory.INTERNAL
+    code_default: ClassVar[str] = "INTERNAL_ERROR"
+    http_status_default: ClassVar[int] = 500
+    # Whether this error type is worth retrying (per-instance value is `retryable`)
+    retryable_default: ClassVar[bool] = False
 
     def __init__(
         self,
-        message: str,
-        category: ErrorCategory,
-        code: str,
-        http_status: int = 500,
-        retryable: bool = False,
-        details: Optional[Dict[str, Any]] = None
+        message: Optional[str] = None,
+        *,
+        details: Optional[Dict[str, Any]] = None,
+        category: Optional[ErrorCategory] = None,
+        code: Optional[str] = None,
+        http_status: Optional[int] = None,
+        retryable: Optional[bool] = None,
     ):
+        cls = type(self)
+        if message is None:
+            message = cls.message_default
         super().__init__(message)
-        self.error_detail = ErrorDetail(
-            category=category,
-            code=code,
-            message=message,
-            http_status=http_status,
-            retryable=retryable,
-            details=details or {}
-        )
+        self.message = message
+        self.category = cls.category_default if category is None else category
+        self.code = cls.code_default if code is None else code
+        self.http_status = cls.http_status_default if http_status is None else http_status
+        self.retryable = cls.retryable_default if retryable is None else retryable
+        # None when there is nothing to report (no empty dict per raise)
+        self.details = details
+        self._error_detail: Optional[ErrorDetail] = None
+
+    @property
+    def error_detail(self) -> ErrorDetail:
+        """
+        Structured error detail, built on first access.
+
+        Most errors are retried rather than serialized, so this is usually never built.
+        """
+        if self._error_detail is None:
+            self._error_detail = ErrorDetail(
+                category=self.category,
+                code=self.code,
+                message=self.message,
+                http_status=self.http_status,
+                retryable=self.retryable,
+                details=self.details,
+            )
+        return self._error_detail
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for API response."""
+        return self.error_detail.to_dict()
+
 
+class _DetailsError(AdsAPIError):
+    """Base for errors taking (message, details) positionally, as they always have."""
 
-class AuthenticationError(AdsAPIError):
+    def __init__(self, message: Optional[str] = None, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, details=details)
+
+
+class AuthenticationError(_DetailsError):
     """Authentication failed."""
 
-    def __init__(self, message: str = "Authentication failed", details: Optional[Dict[str, Any]] = None):
-        super().__init__(
-            message=message,
-            category=ErrorCategory.AUTHENTICATION,
-            code="AUTH_FAILED",
-            http_status=401,
-            retryable=False,
-            details=details
-        )
+    message_default = "Authentication failed"
+    category_default = ErrorCategory.AUTHENTICATION
+    code_default = "AUTH_FAILED"
+    http_status_default = 401
+    retryable_default = False
 
 
-class AuthorizationError(AdsAPIError):
+class AuthorizationError(_DetailsError):
     """Authorization/permission denied."""
 
-    def __init__(self, message: str = "Permission denied", details: Optional[Dict[str, Any]] = None):
-        super().__init__(
-            message=message,
-            category=ErrorCategory.AUTHORIZATION,
-            code="PERMISSION_DENIED",
-            http_status=403,
-            retryable=False,
-            details=details
-        )
+    message_default = "Permission denied"
+    category_default = ErrorCategory.AUTHORIZATION
+    code_default = "PERMISSION_DENIED"
+    http_status_default = 403
+    retryable_default = False
 
 
 class QuotaExceededError(AdsAPIError):
     """Quota limit exceeded."""
 
+    message_default = "Quota exceeded"
+    category_default = ErrorCategory.QUOTA
+    code_default = "QUOTA_EXCEEDED"
+    http_status_default = 429
+    retryable_default = True
+
     def __init__(
         self,
-        message: str = "Quota exceeded",
+        message: Optional[str] = None,
         client_id: Optional[str] = None,
         details: Optional[Dict[str, Any]] = None
     ):
-        error_details = details or {}
         if client_id:
-            error_details["client_id"] = client_id
-
-        super().__init__(
-            message=message,
-            category=ErrorCategory.QUOTA,
-            code="QUOTA_EXCEEDED",
-            http_status=429,
-            retryable=True,
-            details=error_details
-        )
+            details = {**(details or {}), "client_id": client_id}
+        super().__init__(message, details=details)
 
 
 class RateLimitError(AdsAPIError):
     """Rate limit exceeded."""
 
+    message_default = "Rate limit exceeded"
+    category_default = ErrorCategory.RATE_LIMIT
+    code_default = "RATE_LIMIT_EXCEEDED"
+    http_status_default = 429
+    retryable_default = True
+
     def __init__(
         self,
-        message: str = "Rate limit exceeded",
+        message: Optional[str] = None,
         retry_after: Optional[int] = None,
         details: Optional[Dict[str, Any]] = None
     ):
-        error_details = details or {}
         if retry_after:
-            error_details["retry_after"] = retry_after
-
-        super().__init__(
-            message=message,
-            category=ErrorCategory.RATE_LIMIT,
-            code="RATE_LIMIT_EXCEEDED",
-            http_status=429,
-            retryable=True,
-            details=error_details
-        )
+            details = {**(details or {}), "retry_after": retry_after}
+        super().__init__(message, details=details)
 
 
-class ValidationError(AdsAPIError):
+class ValidationError(_DetailsError):
     """Request validation failed."""
 
-    def __init__(self, message: str = "Validation failed", details: Optional[Dict[str, Any]] = None):
-        super().__init__(
-            message=message,
-            category=ErrorCategory.VALIDATION,
-            code="VALIDATION_ERROR",
-            http_status=400,
-            retryable=False,
-            details=details
-        )
+    message_default = "Validation failed"
+    category_default = ErrorCategory.VALIDATION
+    code_default = "VALIDATION_ERROR"
+    http_status_default = 400
+    retryable_default = False
 
 
 class NotFoundError(AdsAPIError):
     """Resource not found."""
 
-    def __init__(self, message: str = "Resource not found", resource: Optional[str] = None):
-        details = {"resource": resource} if resource else None
-        super().__init__(
-            message=message,
-            category=ErrorCategory.NOT_FOUND,
-            code="NOT_FOUND",
-            http_status=404,
-            retryable=False,
-            details=details
-        )
+    message_default = "Resource not found"
+    category_default = ErrorCategory.NOT_FOUND
+    code_default = "NOT_FOUND"
+    http_status_default = 404
+    retryable_default = False
 
+    def __init__(self, message: Optional[str] = None, resource: Optional[str] = None):
+        super().__init__(message, details={"resource": resource} if resource else None)
 
-class ConflictError(AdsAPIError):
+
+class ConflictError(_DetailsError):
     """Resource conflict (e.g., duplicate)."""
 
-    def __init__(self, message: str = "Resource conflict", details: Optional[Dict[str, Any]] = None):
-        super().__init__(
-            message=message,
-            category=ErrorCategory.CONFLICT,
-            code="CONFLICT",
-            http_status=409,
-            retryable=False,
-            details=details
-        )
+    message_default = "Resource conflict"
+    category_default = ErrorCategory.CONFLICT
+    code_default = "CONFLICT"
+    http_status_default = 409
+    retryable_default = False
 
 
 class TimeoutError(AdsAPIError):
     """Operation timeout."""
 
-    def __init__(self, message: str = "Operation timed out", timeout_seconds: Optional[int] = None):
-        details = {"timeout_seconds": timeout_seconds} if timeout_seconds else None
+    message_default = "Operation timed out"
+    category_default = ErrorCategory.TIMEOUT
+    code_default = "TIMEOUT"
+    http_status_default = 504
+    retryable_default = True
+
+    def __init__(self, message: Optional[str] = None, timeout_seconds: Optional[int] = None):
         super().__init__(
-            message=message,
-            category=ErrorCategory.TIMEOUT,
-            code="TIMEOUT",
-            http_status=504,
-            retryable=True,
-            details=details
+            message, details={"timeout_seconds": timeout_seconds} if timeout_seconds else None
         )
 
 
 class CircuitBreakerError(AdsAPIError):
     """Circuit breaker is open."""
 
-    def __init__(
-        self,
-        message: str = "Service temporarily unavailable (circuit breaker open)",
-        retry_after: Optional[int] = None
-    ):
-        details = {"retry_after": retry_after} if retry_after else None
-        super().__init__(
-            message=message,
-            category=ErrorCategory.CIRCUIT_BREAKER,
-            code="CIRCUIT_BREAKER_OPEN",
-            http_status=503,
-            retryable=True,
-            details=details
-        )
+    message_default = "Service temporarily unavailable (circuit breaker open)"
+    category_default = ErrorCategory.CIRCUIT_BREAKER
+    code_default = "CIRCUIT_BREAKER_OPEN"
+    http_status_default = 503
+    retryable_default = True
+
+    def __init__(self, message: Optional[str] = None, retry_after: Optional[int] = None):
+        super().__init__(message, details={"retry_after": retry_after} if retry_after else None)
 
 
 class ExternalAPIError(AdsAPIError):
     """Error from Google Ads API."""
 
+    message_default = "External API error"
+    category_default = ErrorCategory.EXTERNAL_API
+    code_default = "EXTERNAL_API_ERROR"
+    http_status_default = 502
+    retryable_default = False
+
     def __init__(
         self,
         message: str,
@@ -233,32 +258,19 @@ class ExternalAPIError(AdsAPIError):
         retryable: bool = False,
         details: Optional[Dict[str, Any]] = None
     ):
-        error_details = details or {}
         if google_ads_error_code:
-            error_details["google_ads_error_code"] = google_ads_error_code
-
-        super().__init__(
-            message=message,
-            category=ErrorCategory.EXTERNAL_API,
-            code="EXTERNAL_API_ERROR",
-            http_status=502,
-            retryable=retryable,
-            details=error_details
-        )
+            details = {**(details or {}), "google_ads_error_code": google_ads_error_code}
+        super().__init__(message, details=details, retryable=retryable)
 
 
-class InternalError(AdsAPIError):
+class InternalError(_DetailsError):
     """Internal server error."""
 
-    def __init__(self, message: str = "Internal server error", details: Optional[Dict[str, Any]] = None):
-        super().__init__(
-            message=message,
-            category=ErrorCategory.INTERNAL,
-            code="INTERNAL_ERROR",
-            http_status=500,
-            retryable=False,
-            details=details
-        )
+    message_default = "Internal server error"
+    category_default = ErrorCategory.INTERNAL
+    code_default = "INTERNAL_ERROR"
+    http_status_default = 500
+    retryable_default = False
 
 
 # Google Ads error code to our error mapping
@@ -276,6 +288,10 @@ GOOGLE_ADS_ERROR_MAP: Dict[str, type[AdsAPIError]] = {
     "UNAVAILABLE": ExternalAPIError,
 }
 
+# Transient codes that map to the generic ExternalAPIError (other types carry
+# their retryability as retryable_default)
+_RETRYABLE_EXTERNAL_CODES = frozenset({"UNAVAILABLE"})
+
 
 def map_google_ads_exception(exception: Exception) -> AdsAPIError:
     """
@@ -289,26 +305,20 @@ def map_google_ads_exception(exception: Exception) -> AdsAPIError:
     """
     # Extract error code from Google Ads exception
     # This is a simplified version - actual implementation would parse GoogleAdsException
-    error_code = getattr(exception, "error_code", "UNKNOWN")
+    try:
+        error_code = exception.error_code
+    except AttributeError:
+        error_code = "UNKNOWN"
     error_message = str(exception)
 
     # Map to our error type
     error_class = GOOGLE_ADS_ERROR_MAP.get(error_code, ExternalAPIError)
 
-    # Determine if retryable
-    retryable = error_code in [
-        "QUOTA_ERROR",
-        "RATE_LIMIT_ERROR",
-        "RESOURCE_EXHAUSTED",
-        "DEADLINE_EXCEEDED",
-        "UNAVAILABLE"
-    ]
-
-    if error_class == ExternalAPIError:
+    if error_class is ExternalAPIError:
         return error_class(
             message=error_message,
             google_ads_error_code=error_code,
-            retryable=retryable,
+            retryable=error_code in _RETRYABLE_EXTERNAL_CODES,
             details={"original_error": error_code}
         )
     else:
@@ -5,15 +5,18 @@ Provides a unified interface for Google Ads operations with quota/scheduler inte
 """
 
 import asyncio
+import functools
 import logging
-from typing import Any, Dict, List, Optional, Callable
+import random
+from typing import Any, Awaitable, Dict, List, Optional, Callable, TypeVar, Union
 from dataclasses import dataclass
 from enum import Enum
 
 from tenacity import (
-    retry,
+    AsyncRetrying,
     stop_after_attempt,
-    wait_exponential_jitter,
+    wait_exponential,
+    wait_random,
     retry_if_exception_type,
 )
 
@@ -26,10 +29,65 @@ from core.errors import (
 )
 from core.quota import QuotaGovernor, SLATier
 from core.scheduler import PriorityScheduler
-from core.cache import CacheManager
+from core.cache import CacheManager, ServiceTTL, memoize
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Upstream retry policy: RETRY_ATTEMPTS attempts with exponential backoff plus
+# up to 1s jitter (1s, 2s, 4s, ... capped at RETRY_MAX_WAIT) between them
+RETRY_ATTEMPTS = 3
+RETRY_INITIAL_WAIT = 1
+RETRY_MAX_WAIT = 10
+RETRYABLE_ERRORS = (RateLimitError, ExternalAPIError)
+
+# Controller for attempts 2..RETRY_ATTEMPTS; built once and copied per use,
+# since a tenacity controller keeps per-run state
+_RETRYING = AsyncRetrying(
+    stop=stop_after_attempt(RETRY_ATTEMPTS - 1),
+    wait=(
+        wait_exponential(multiplier=RETRY_INITIAL_WAIT * 2, max=RETRY_MAX_WAIT)
+        + wait_random(0, 1)
+    ),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True,
+)
+
+
+async def _call_with_retry(fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+    """
+    Call fn, retrying RETRYABLE_ERRORS per the module retry policy.
+
+    The first attempt runs without any retry machinery; tenacity is only
+    involved once a retryable error has occurred.
+
+    Args:
+        fn: Coroutine function to call
+        *args: Arguments for fn
+
+    Returns:
+        Result of fn
+    """
+    try:
+        return await fn(*args)
+    except RETRYABLE_ERRORS as e:
+        logger.warning("Retrying %s after error: %s", fn.__name__, e)
+
+    await asyncio.sleep(RETRY_INITIAL_WAIT + random.uniform(0, 1))
+    return await _RETRYING.copy()(fn, *args)
+
+
+@memoize(maxsize=10_000)
+def _gaql_cache_key(client_id: str, query: str, page_size: int) -> str:
+    """Cache key for a GAQL query, memoized since dashboards repeat the same queries."""
+    return CacheManager.build_cache_key(
+        client_id=client_id,
+        operation="gaql",
+        query=query,
+        page_size=page_size,
+    )
+
 
 class OperationType(str, Enum):
     """Types of Google Ads operations."""
@@ -39,7 +97,7 @@ class OperationType(str, Enum):
     GET = "get"
 
 
-@dataclass
+@dataclass(slots=True)
 class GAQLRequest:
     """GAQL query request."""
 
@@ -47,10 +105,10 @@ class GAQLRequest:
     client_id: str
     page_size: int = 1000
     cache_enabled: bool = True
-    service_type: str = "reporting"
+    service_type: Union[str, ServiceTTL] = "reporting"
 
 
-@dataclass
+@dataclass(slots=True)
 class MutateRequest:
     """Mutate operation request."""
 
@@ -60,6 +118,23 @@ class MutateRequest:
     validate_only: bool = False
 
 
+# Canned GAQL rows returned by the mock client; built once, never mutated
+_MOCK_SEARCH_ROWS = (
+    {
+        "campaign": {
+            "id": "123456789",
+            "name": "Mock Campaign",
+            "status": "ENABLED",
+        },
+        "metrics": {
+            "impressions": 1000,
+            "clicks": 50,
+            "cost_micros": 5000000,
+        }
+    },
+)
+
+
 class MockGoogleAdsClient:
     """
     Mock Google Ads client for testing.
@@ -89,23 +164,10 @@ class MockGoogleAdsClient:
         Returns:
             Mock search results
         """
-        logger.debug(f"Mock search for customer {customer_id}: {query}")
-
-        # Return mock data
-        return [
-            {
-                "campaign": {
-                    "id": "123456789",
-                    "name": "Mock Campaign",
-                    "status": "ENABLED",
-                },
-                "metrics": {
-                    "impressions": 1000,
-                    "clicks": 50,
-                    "cost_micros": 5000000,
-                }
-            }
-        ]
+        logger.debug("Mock search for customer %s: %s", customer_id, query)
+
+        # Return mock data (fresh list, shared read-only rows)
+        return list(_MOCK_SEARCH_ROWS)
 
     def mutate(
         self,
@@ -125,15 +187,16 @@ class MockGoogleAdsClient:
             Mock mutate response
         """
         logger.debug(
-            f"Mock mutate for customer {customer_id}: "
-            f"{len(operations)} operations (validate_only={validate_only})"
+            "Mock mutate for customer %s: %d operations (validate_only=%s)",
+            customer_id, len(operations), validate_only,
         )
 
-        # Return mock response
+        # Return mock response (format the shared prefix and each index once)
+        prefix = f"customers/{customer_id}/campaigns/"
         return {
             "results": [
-                {"resource_name": f"customers/{customer_id}/campaigns/{i}", "operation_id": str(i)}
-                for i in range(len(operations))
+                {"resource_name": prefix + op_id, "operation_id": op_id}
+                for op_id in map(str, range(len(operations)))
             ],
             "partial_failure_error": None,
         }
@@ -186,59 +249,58 @@ class GoogleAdsManager:
         Returns:
             Query results
         """
-        # Check cache first
-        if request.cache_enabled:
-            cache_key = self.cache_manager.build_cache_key(
-                client_id=request.client_id,
-                operation="gaql",
-                query=request.query,
-                page_size=request.page_size,
-            )
-            cached_result = await self.cache_manager.get(cache_key, request.service_type)
-            if cached_result is not None:
-                logger.info(f"Cache hit for GAQL query (client={request.client_id})")
-                return cached_result
-
-        # Get client tier
-        tier = await self.quota_governor.get_client_tier(request.client_id)
-
-        # Check if client is paused
-        if await self.quota_governor.is_client_paused(request.client_id):
-            raise QuotaExceededError(
-                f"Client {request.client_id} is paused",
-                client_id=request.client_id
-            )
-
-        # Check quota (estimated 10 units per query)
+        if not request.cache_enabled:
+            return await self._run_gaql(request, urgency)
+
+        # Cache lookup; concurrent misses for the same query share one upstream call
+        cache = self.cache_manager
+        cache_key = _gaql_cache_key(request.client_id, request.query, request.page_size)
+        # In-memory hit: no cache coroutine needed
+        cached = cache.peek(cache_key)
+        if cached is not None:
+            return cached
+        return await cache.fill(
+            cache_key,
+            functools.partial(self._run_gaql, request, urgency),
+            service_type=request.service_type,
+        )
+
+    async def _run_gaql(
+        self,
+        request: GAQLRequest,
+        urgency: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run GAQL search query upstream (no caching) with quota/scheduler integration.
+
+        Args:
+            request: GAQL request parameters
+            urgency: Operation urgency (0-99)
+
+        Returns:
+            Query results
+        """
+        client_id = request.client_id
+
+        # Admit and charge quota in one atomic round-trip (estimated 10 units per query)
         quota_units = 10
-        if not await self.quota_governor.can_run(request.client_id, quota_units, tier):
-            raise QuotaExceededError(
-                "Insufficient quota for GAQL query",
-                client_id=request.client_id
-            )
+        tier, allowed, reason, charged = await self.quota_governor.try_admit(client_id, quota_units)
+        if not allowed:
+            raise QuotaExceededError(reason, client_id=client_id)
 
         # Execute via scheduler
-        result = await self._execute_operation(
+        return await self._execute_operation(
             operation_fn=self._search_with_retry,
-            client_id=request.client_id,
+            client_id=client_id,
             tier=tier,
             urgency=urgency,
             quota_units=quota_units,
-            customer_id=request.client_id,
+            charged=charged,
+            customer_id=client_id,
             query=request.query,
             page_size=request.page_size,
         )
 
-        # Cache result
-        if request.cache_enabled and result:
-            await self.cache_manager.set(
-                cache_key,
-                result,
-                service_type=request.service_type
-            )
-
-        return result
-
     async def execute_mutate(
         self,
         request: MutateRequest,
@@ -254,32 +316,23 @@ class GoogleAdsManager:
         Returns:
             Mutate response
         """
-        # Get client tier
-        tier = await self.quota_governor.get_client_tier(request.client_id)
-
-        # Check if client is paused
-        if await self.quota_governor.is_client_paused(request.client_id):
-            raise QuotaExceededError(
-                f"Client {request.client_id} is paused",
-                client_id=request.client_id
-            )
+        client_id = request.client_id
 
-        # Check quota (estimated 50 units per mutate operation)
+        # Admit and charge quota in one atomic round-trip (estimated 50 units per mutate operation)
         quota_units = 50 * len(request.operations)
-        if not await self.quota_governor.can_run(request.client_id, quota_units, tier):
-            raise QuotaExceededError(
-                "Insufficient quota for mutate operation",
-                client_id=request.client_id
-            )
+        tier, allowed, reason, charged = await self.quota_governor.try_admit(client_id, quota_units)
+        if not allowed:
+            raise QuotaExceededError(reason, client_id=client_id)
 
         # Execute via scheduler
         result = await self._execute_operation(
             operation_fn=self._mutate_with_retry,
-            client_id=request.client_id,
+            client_id=client_id,
             tier=tier,
             urgency=urgency,
             quota_units=quota_units,
-            customer_id=request.client_id,
+            charged=charged,
+            customer_id=client_id,
             operations=request.operations,
             validate_only=request.validate_only,
         )
@@ -293,6 +346,7 @@ class GoogleAdsManager:
         tier: SLATier,
         urgency: int,
         quota_units: int,
+        charged: bool,
         **kwargs: Any,
     ) -> Any:
         """
@@ -303,23 +357,30 @@ class GoogleAdsManager:
             client_id: Client ID
             tier: SLA tier
             urgency: Operation urgency
-            quota_units: Quota units to charge
+            quota_units: Quota units the operation costs
+            charged: Whether admission already charged quota_units. If so they
+                are refunded when the operation fails or never starts;
+                otherwise (admitted fail-open) they are charged after success.
             **kwargs: Arguments for operation_fn
 
         Returns:
             Operation result
         """
+        started = False
+
         async def wrapped_operation() -> Any:
-            """Wrapper that handles quota charging."""
+            """Wrapper that refunds a failed charged op and charges an uncharged success."""
+            nonlocal started
+            started = True
             try:
                 result = await operation_fn(**kwargs)
-                # Charge quota on success
-                await self.quota_governor.charge(client_id, quota_units)
-                return result
-            except Exception as e:
-                # Optionally refund quota on certain errors
-                logger.error(f"Operation failed for client {client_id}: {e}")
+            except Exception:
+                if charged:
+                    await self.quota_governor.refund(client_id, quota_units)
                 raise
+            if not charged:
+                await self.quota_governor.charge(client_id, quota_units)
+            return result
 
         # Submit to scheduler and get completion future
         future = await self.scheduler.submit(
@@ -335,14 +396,16 @@ class GoogleAdsManager:
             return result
         except asyncio.TimeoutError:
             logger.error(f"Operation timed out for client {client_id}")
+            # Still queued: the scheduler will skip it, so it never consumes quota
+            if charged and not started:
+                await self.quota_governor.refund(client_id, quota_units)
             raise TimeoutError(f"Operation timed out after 120 seconds", timeout_seconds=120)
+        except asyncio.CancelledError:
+            # Caller went away while queued: the scheduler skips the op too
+            if charged and not started:
+                await self.quota_governor.refund(client_id, quota_units)
+            raise
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential_jitter(initial=1, max=10),
-        retry=retry_if_exception_type((RateLimitError, ExternalAPIError)),
-        reraise=True,
-    )
     async def _search_with_retry(
         self,
         customer_id: str,
@@ -360,6 +423,15 @@ class GoogleAdsManager:
         Returns:
             Search results
         """
+        return await _call_with_retry(self._search, customer_id, query, page_size)
+
+    async def _search(
+        self,
+        customer_id: str,
+        query: str,
+        page_size: int,
+    ) -> List[Dict[str, Any]]:
+        """Execute one GAQL search attempt, mapping SDK errors to our types."""
         try:
             # Use mock or real client
             results = self.client.search(customer_id, query, page_size)
@@ -369,12 +441,6 @@ class GoogleAdsManager:
             # Map to our error types
             raise map_google_ads_exception(e)
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential_jitter(initial=1, max=10),
-        retry=retry_if_exception_type((RateLimitError, ExternalAPIError)),
-        reraise=True,
-    )
     async def _mutate_with_retry(
         self,
         customer_id: str,
@@ -392,6 +458,15 @@ class GoogleAdsManager:
         Returns:
             Mutate response
         """
+        return await _call_with_retry(self._mutate, customer_id, operations, validate_only)
+
+    async def _mutate(
+        self,
+        customer_id: str,
+        operations: List[Dict[str, Any]],
+        validate_only: bool,
+    ) -> Dict[str, Any]:
+        """Execute one mutate attempt, mapping SDK errors to our types."""
         try:
             # Use mock or real client
             response = self.client.mutate(customer_id, operations, validate_only)
@@ -4,12 +4,16 @@ Quota Governor for managing global and per-client API quota budgets.
 Enforces SLA-based quota allocation and tracks consumption.
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import time
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, Tuple
 from enum import Enum
 
 import redis.asyncio as redis
 
+from core.cache import LRUCache, memoize
 from core.errors import QuotaExceededError
 
 logger = logging.getLogger(__name__)
@@ -24,7 +28,114 @@ class SLATier(str, Enum):
 
 
 # Reserve percentages for tier-based throttling
-BRONZE_RESERVE_THRESHOLD = 0.15  # Bronze paused when global < 15%
+BRONZE_RESERVE_PCT = 15  # Bronze paused when global < 15%
+BRONZE_RESERVE_THRESHOLD = BRONZE_RESERVE_PCT / 100
+
+# Whole percent of the global daily quota each tier must leave in reserve:
+# a tier is throttled once global_remaining drops below it (0 = never).
+# Integer percents let the check cross-multiply instead of using floats.
+# Read-only: _RESERVE_ARGS below is derived from it once at import.
+TIER_RESERVE_PCT: Mapping[SLATier, int] = MappingProxyType({
+    SLATier.GOLD: 0,
+    SLATier.SILVER: 0,
+    SLATier.BRONZE: BRONZE_RESERVE_PCT,
+})
+
+# The same table as flat (tier, percent) ARGV pairs for ADMIT_LUA
+_RESERVE_ARGS = tuple(
+    arg for tier, pct in TIER_RESERVE_PCT.items() for arg in (tier.value, pct)
+)
+
+# Charges/refunds are summed in-process and written in one pipeline at most
+# every QUOTA_FLUSH_INTERVAL seconds
+QUOTA_FLUSH_INTERVAL = 0.002
+
+# How long a client's tier is served from the in-process cache (seconds).
+# Tier changes made through another process show up after at most this long.
+TIER_CACHE_TTL = 30.0
+TIER_CACHE_MAXSIZE = 10_000
+
+# Net units consumed per wall-clock minute are counted under
+# quota:audit:<minute>:used in the same round-trip as the charge, and kept
+# for AUDIT_KEY_TTL seconds
+AUDIT_KEY_TTL = 3600
+
+# How long a rejected admission is remembered per client (seconds), so a
+# throttled or paused client retrying in a loop doesn't hit Redis each time
+DENY_CACHE_TTL = 0.25
+
+# Atomic admission: read tier/pause/quota, apply the same rules as
+# _quota_rejection and charge both budgets (and the audit counter) only if admitted.
+# KEYS: tier, paused, global_remaining, client_remaining, global_daily, gen, audit
+# ARGV: units, audit TTL, default reserve percent, (tier, reserve percent) pairs...
+# Returns {admitted, tier, paused, global_remaining, client_remaining, global_daily, gen}
+ADMIT_LUA = """
+local tier = redis.call("GET", KEYS[1]) or ""
+local gen = redis.call("GET", KEYS[6]) or "0"
+if redis.call("GET", KEYS[2]) == "1" then
+    return {0, tier, 1, 0, 0, 0, gen}
+end
+local units = tonumber(ARGV[1])
+local global_remaining = tonumber(redis.call("GET", KEYS[3]) or "0")
+local client_remaining = tonumber(redis.call("GET", KEYS[4]) or "0")
+local global_daily = tonumber(redis.call("GET", KEYS[5]) or "1")
+local reserve = tonumber(ARGV[3])
+for i = 4, #ARGV, 2 do
+    if tier == ARGV[i] then
+        reserve = tonumber(ARGV[i + 1])
+    end
+end
+local admitted = global_remaining >= units and client_remaining >= units
+    and global_remaining * 100 >= reserve * global_daily
+if not admitted then
+    return {0, tier, 0, global_remaining, client_remaining, global_daily, gen}
+end
+redis.call("DECRBY", KEYS[3], units)
+redis.call("DECRBY", KEYS[4], units)
+redis.call("INCRBY", KEYS[7], units)
+redis.call("EXPIRE", KEYS[7], ARGV[2])
+return {1, tier, 0, global_remaining - units, client_remaining - units, global_daily, gen}
+"""
+
+# Global keys, pre-encoded: redis-py sends bytes keys without encoding them
+GLOBAL_REMAINING_KEY = b'quota:global_remaining'
+GLOBAL_DAILY_KEY = b'quota:global_daily'
+
+# Bumped by every tier/pause change; try_admit reads it along with the
+# admission decision and drops local tier/deny caches when it moves, so
+# changes made through another process apply without waiting for a TTL
+QUOTA_GEN_KEY = b'quota:gen'
+
+
+@memoize(maxsize=4)
+def _audit_key(minute: int) -> bytes:
+    """Key counting net units consumed during one epoch minute."""
+    return f'quota:audit:{minute}:used'.encode()
+
+
+def _current_audit_key() -> bytes:
+    """Audit key for the current wall-clock minute."""
+    return _audit_key(int(time.time()) // 60)
+
+
+# Per-client keys are built and encoded once per client; redis-py sends
+# bytes keys as-is, so repeat calls skip both the f-string and the encode
+@memoize(maxsize=4096)
+def _client_remaining_key(client_id: str) -> bytes:
+    """Key holding a client's remaining quota."""
+    return f'quota:client:{client_id}:remaining'.encode()
+
+
+@memoize(maxsize=4096)
+def _client_tier_key(client_id: str) -> bytes:
+    """Key holding a client's SLA tier."""
+    return f'client:{client_id}:tier'.encode()
+
+
+@memoize(maxsize=4096)
+def _client_paused_key(client_id: str) -> bytes:
+    """Key flagging a paused client."""
+    return f'client:{client_id}:paused'.encode()
 
 
 class QuotaGovernor:
@@ -42,8 +153,43 @@ class QuotaGovernor:
             redis_client: Redis async client for quota state
         """
         self.redis = redis_client
+        self._admit_script = redis_client.register_script(ADMIT_LUA)
+        # Net units to deduct per client, not yet written to Redis
+        self._pending: Dict[str, int] = {}
+        self._flusher: Optional[asyncio.Task[None]] = None
+        # client_id -> (tier, monotonic expiry); bounded so many distinct
+        # clients can't grow it without limit
+        self._tier_cache = LRUCache(maxsize=TIER_CACHE_MAXSIZE)
+        # client_id -> (monotonic expiry, min units denied, tier, reason);
+        # bounded like the tier cache, since expired entries are only
+        # dropped when the same client calls again
+        self._deny_cache = LRUCache(maxsize=TIER_CACHE_MAXSIZE)
+        # Last QUOTA_GEN_KEY value seen
+        self._gen: Any = None
         logger.info("QuotaGovernor initialized")
 
+    @classmethod
+    def from_url(cls, url: str, max_connections: int = 64, **pool_kwargs: Any) -> "QuotaGovernor":
+        """
+        Create a governor with its own bounded, blocking connection pool.
+
+        For standalone processes (workers, scripts). The API server passes
+        its shared client to __init__ instead, so cache and quota reuse one pool.
+
+        Args:
+            url: Redis URL
+            max_connections: Pool size; callers wait for a free connection
+                rather than opening more
+            **pool_kwargs: Extra BlockingConnectionPool options (e.g. timeout)
+
+        Returns:
+            QuotaGovernor backed by the new pool
+        """
+        pool = redis.BlockingConnectionPool.from_url(
+            url, max_connections=max_connections, **pool_kwargs
+        )
+        return cls(redis.Redis.from_pool(pool))
+
     async def can_run(
         self,
         client_id: str,
@@ -62,76 +208,227 @@ class QuotaGovernor:
             True if operation can proceed
         """
         try:
-            # Get quota values
-            global_remaining = int(await self.redis.get('quota:global_remaining') or 0)
-            client_remaining = int(
-                await self.redis.get(f'quota:client:{client_id}:remaining') or 0
+            # Get quota values in a single round-trip
+            global_remaining, client_remaining, global_daily = await self.redis.mget(
+                GLOBAL_REMAINING_KEY,
+                _client_remaining_key(client_id),
+                GLOBAL_DAILY_KEY,
             )
-            global_daily = int(await self.redis.get('quota:global_daily') or 1)
 
-            # Check if either quota is insufficient
-            if global_remaining < units or client_remaining < units:
-                logger.warning(
-                    f"Quota insufficient for client {client_id}: "
-                    f"global={global_remaining}, client={client_remaining}, needed={units}"
-                )
-                return False
-
-            # Bronze tier throttling: pause if global quota < 15%
-            if tier == SLATier.BRONZE:
-                threshold = BRONZE_RESERVE_THRESHOLD * global_daily
-                if global_remaining < threshold:
-                    logger.warning(
-                        f"Bronze tier throttled for client {client_id}: "
-                        f"global_remaining={global_remaining} < threshold={threshold}"
-                    )
-                    return False
-
-            return True
+            return self._quota_rejection(
+                client_id,
+                units,
+                tier,
+                int(global_remaining or 0),
+                int(client_remaining or 0),
+                int(global_daily or 1),
+            ) is None
 
         except Exception as e:
             logger.error(f"Error checking quota for client {client_id}: {e}")
             # Fail open or closed based on policy - here we fail open (allow)
             return True
 
-    async def charge(self, client_id: str, units: int) -> None:
+    async def try_admit(self, client_id: str, units: int) -> Tuple[SLATier, bool, str, bool]:
         """
-        Charge quota after successful operation.
+        Admit an operation and charge its quota in one atomic Redis call.
+
+        Runs the tier, pause and quota checks and the charge server-side, so two
+        workers can no longer both pass the check and overdraw. Callers
+        refund() if the admitted operation does not complete.
+
+        A rejection is remembered for DENY_CACHE_TTL and repeated without a
+        Redis call for requests of at least as many units.
 
         Args:
             client_id: Client identifier
-            units: Number of quota units to charge
+            units: Number of quota units needed
+
+        Returns:
+            Tuple of (tier, allowed, reason, charged); reason is empty when
+            allowed. charged is False when Redis was unreachable and the
+            operation was let through uncharged (fail open): the caller must
+            charge() it after success and must not refund it.
         """
+        denied = self._deny_cache.get(client_id)
+        if denied is not None:
+            if denied[0] > time.monotonic() and units >= denied[1]:
+                return denied[2], False, denied[3], False
+            self._deny_cache.delete(client_id)
+
         try:
-            pipe = self.redis.pipeline()
-            pipe.decrby('quota:global_remaining', units)
-            pipe.decrby(f'quota:client:{client_id}:remaining', units)
-            await pipe.execute()
+            admitted, tier_raw, paused, global_remaining, client_remaining, global_daily, gen = (
+                await self._admit_script(
+                    keys=[
+                        _client_tier_key(client_id),
+                        _client_paused_key(client_id),
+                        GLOBAL_REMAINING_KEY,
+                        _client_remaining_key(client_id),
+                        GLOBAL_DAILY_KEY,
+                        QUOTA_GEN_KEY,
+                        _current_audit_key(),
+                    ],
+                    args=[
+                        units,
+                        AUDIT_KEY_TTL,
+                        # Unset/invalid tiers count as BRONZE, as in _parse_tier
+                        TIER_RESERVE_PCT[SLATier.BRONZE],
+                        *_RESERVE_ARGS,
+                    ],
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error admitting operation for client {client_id}: {e}")
+            # Fail open, as can_run does (nothing was charged)
+            return SLATier.BRONZE, True, "", False
+
+        if gen != self._gen:
+            # Tier/pause changed somewhere since the last admission
+            self._gen = gen
+            self._tier_cache.clear()
+            self._deny_cache.clear()
+
+        tier = self._parse_tier(client_id, tier_raw)
+        if admitted:
+            logger.debug(f"Admitted and charged {units} units to client {client_id}")
+            return tier, True, "", True
+        if paused:
+            reason = f"Client {client_id} is paused"
+            min_units = 0
+        else:
+            reason = self._quota_rejection(
+                client_id, units, tier, global_remaining, client_remaining, global_daily
+            ) or "Insufficient quota"
+            # Short on quota: only as many units or more are sure to fail.
+            # Otherwise it was the tier reserve, which applies to any size.
+            available = min(global_remaining, client_remaining)
+            min_units = available + 1 if units > available else 0
+
+        self._deny_cache.set(
+            client_id, (time.monotonic() + DENY_CACHE_TTL, min_units, tier, reason)
+        )
+        return tier, False, reason, False
+
+    def _parse_tier(self, client_id: str, tier_raw: Any) -> SLATier:
+        """Decode a stored tier value, defaulting to BRONZE when unset or invalid."""
+        if tier_raw:
+            try:
+                return SLATier(tier_raw.decode() if isinstance(tier_raw, bytes) else tier_raw)
+            except ValueError:
+                logger.error(f"Invalid tier for client {client_id}: {tier_raw!r}")
+        return SLATier.BRONZE
+
+    def _quota_rejection(
+        self,
+        client_id: str,
+        units: int,
+        tier: SLATier,
+        global_remaining: int,
+        client_remaining: int,
+        global_daily: int,
+    ) -> Optional[str]:
+        """
+        Apply quota and tier throttling rules to already-fetched values.
 
-            logger.debug(f"Charged {units} units to client {client_id}")
+        Returns:
+            Rejection reason, or None if the operation may run
+        """
+        # Check if either quota is insufficient
+        if global_remaining < units or client_remaining < units:
+            logger.warning(
+                f"Quota insufficient for client {client_id}: "
+                f"global={global_remaining}, client={client_remaining}, needed={units}"
+            )
+            return "Insufficient quota"
+
+        # Tier throttling: pause once global quota drops below the tier's reserve
+        reserve_pct = TIER_RESERVE_PCT[tier]
+        if global_remaining * 100 < global_daily * reserve_pct:
+            tier_name = tier.value.capitalize()
+            threshold = global_daily * reserve_pct / 100
+            logger.warning(
+                f"{tier_name} tier throttled for client {client_id}: "
+                f"global_remaining={global_remaining} < threshold={threshold}"
+            )
+            return f"{tier_name} tier throttled (global quota below reserve)"
 
-        except Exception as e:
-            logger.error(f"Error charging quota for client {client_id}: {e}")
-            # Don't raise - quota charge failure shouldn't break the operation
+        return None
+
+    async def charge(self, client_id: str, units: int) -> None:
+        """
+        Charge quota after successful operation.
+
+        The deduction is batched with other charges/refunds and reaches
+        Redis within QUOTA_FLUSH_INTERVAL; call flush() to force it.
+
+        Args:
+            client_id: Client identifier
+            units: Number of quota units to charge
+        """
+        self._add_pending(client_id, units)
+        logger.debug(f"Charged {units} units to client {client_id}")
 
     async def refund(self, client_id: str, units: int) -> None:
         """
         Refund quota units (e.g., after failed operation).
 
+        Batched like charge().
+
         Args:
             client_id: Client identifier
             units: Number of quota units to refund
         """
-        try:
-            pipe = self.redis.pipeline()
-            pipe.incrby('quota:global_remaining', units)
-            pipe.incrby(f'quota:client:{client_id}:remaining', units)
-            await pipe.execute()
+        self._add_pending(client_id, -units)
+        self._deny_cache.delete(client_id)
+        logger.debug(f"Refunded {units} units to client {client_id}")
 
-            logger.debug(f"Refunded {units} units to client {client_id}")
+    def _add_pending(self, client_id: str, units: int) -> None:
+        """
+        Record a net deduction and make sure a flush is scheduled.
+
+        Args:
+            client_id: Client identifier
+            units: Units to deduct (negative to credit)
+        """
+        pending = self._pending
+        pending[client_id] = pending.get(client_id, 0) + units
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """Background task writing pending deductions until none are left."""
+        while self._pending:
+            await asyncio.sleep(QUOTA_FLUSH_INTERVAL)
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        """Write all pending deductions to Redis in one pipeline."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
 
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            total = sum(pending.values())
+            if total:
+                pipe.decrby(GLOBAL_REMAINING_KEY, total)
+                # Refunds count negative, so the audit counter stays net
+                audit_key = _current_audit_key()
+                pipe.incrby(audit_key, total)
+                pipe.expire(audit_key, AUDIT_KEY_TTL)
+            for client_id, units in pending.items():
+                if units:
+                    pipe.decrby(_client_remaining_key(client_id), units)
+            await pipe.execute()
+            logger.debug(f"Flushed quota deductions for {len(pending)} clients")
         except Exception as e:
-            logger.error(f"Error refunding quota for client {client_id}: {e}")
+            # Don't raise - quota charge failure shouldn't break the operation
+            logger.error(f"Error flushing quota deductions for {len(pending)} clients: {e}")
+
+    async def flush(self) -> None:
+        """Wait until every pending charge/refund has been written to Redis."""
+        if self._flusher is not None and not self._flusher.done():
+            await asyncio.shield(self._flusher)
 
     async def get_client_tier(self, client_id: str) -> SLATier:
         """
@@ -143,14 +440,20 @@ class QuotaGovernor:
         Returns:
             SLA tier (defaults to BRONZE if not set)
         """
+        cached = self._tier_cache.get(client_id)
+        now = time.monotonic()
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
         try:
-            tier_str = await self.redis.get(f'client:{client_id}:tier')
-            if tier_str:
-                return SLATier(tier_str.decode() if isinstance(tier_str, bytes) else tier_str)
+            tier_str = await self.redis.get(_client_tier_key(client_id))
         except Exception as e:
             logger.error(f"Error getting tier for client {client_id}: {e}")
+            return SLATier.BRONZE
 
-        return SLATier.BRONZE
+        tier = self._parse_tier(client_id, tier_str)
+        self._tier_cache.set(client_id, (tier, now + TIER_CACHE_TTL))
+        return tier
 
     async def set_client_tier(self, client_id: str, tier: SLATier) -> None:
         """
@@ -161,7 +464,12 @@ class QuotaGovernor:
             tier: SLA tier to set
         """
         try:
-            await self.redis.set(f'client:{client_id}:tier', tier.value)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(_client_tier_key(client_id), tier.value)
+            pipe.incr(QUOTA_GEN_KEY)
+            await pipe.execute()
+            self._tier_cache.delete(client_id)
+            self._deny_cache.delete(client_id)
             logger.info(f"Set tier for client {client_id}: {tier.value}")
         except Exception as e:
             logger.error(f"Error setting tier for client {client_id}: {e}")
@@ -178,7 +486,7 @@ class QuotaGovernor:
             True if client is paused
         """
         try:
-            paused = await self.redis.get(f'client:{client_id}:paused')
+            paused = await self.redis.get(_client_paused_key(client_id))
             return paused == b'1' if isinstance(paused, bytes) else paused == '1'
         except Exception as e:
             logger.error(f"Error checking pause status for client {client_id}: {e}")
@@ -192,7 +500,10 @@ class QuotaGovernor:
             client_id: Client identifier
         """
         try:
-            await self.redis.set(f'client:{client_id}:paused', '1')
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(_client_paused_key(client_id), '1')
+            pipe.incr(QUOTA_GEN_KEY)
+            await pipe.execute()
             logger.info(f"Paused client {client_id}")
         except Exception as e:
             logger.error(f"Error pausing client {client_id}: {e}")
@@ -206,7 +517,11 @@ class QuotaGovernor:
             client_id: Client identifier
         """
         try:
-            await self.redis.delete(f'client:{client_id}:paused')
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(_client_paused_key(client_id))
+            pipe.incr(QUOTA_GEN_KEY)
+            await pipe.execute()
+            self._deny_cache.delete(client_id)
             logger.info(f"Resumed client {client_id}")
         except Exception as e:
             logger.error(f"Error resuming client {client_id}: {e}")
@@ -221,9 +536,10 @@ class QuotaGovernor:
         """
         try:
             pipe = self.redis.pipeline()
-            pipe.set('quota:global_daily', daily_quota)
-            pipe.set('quota:global_remaining', daily_quota)
+            pipe.set(GLOBAL_DAILY_KEY, daily_quota)
+            pipe.set(GLOBAL_REMAINING_KEY, daily_quota)
             await pipe.execute()
+            self._deny_cache.clear()
 
             logger.info(f"Reset global quota to {daily_quota}")
         except Exception as e:
@@ -239,7 +555,8 @@ class QuotaGovernor:
             quota: Quota amount
         """
         try:
-            await self.redis.set(f'quota:client:{client_id}:remaining', quota)
+            await self.redis.set(_client_remaining_key(client_id), quota)
+            self._deny_cache.delete(client_id)
             logger.info(f"Set quota for client {client_id}: {quota}")
         except Exception as e:
             logger.error(f"Error setting quota for client {client_id}: {e}")
@@ -253,17 +570,23 @@ class QuotaGovernor:
             Dictionary with quota information
         """
         try:
-            global_remaining = int(await self.redis.get('quota:global_remaining') or 0)
-            global_daily = int(await self.redis.get('quota:global_daily') or 0)
+            remaining_raw, daily_raw = await self.redis.mget(
+                GLOBAL_REMAINING_KEY, GLOBAL_DAILY_KEY
+            )
+            global_remaining = int(remaining_raw or 0)
+            global_daily = int(daily_raw or 0)
+
+            global_used = global_daily - global_remaining
+            global_used_percent = (
+                round(global_used * 100 / global_daily, 2) if global_daily > 0 else 0
+            )
 
             return {
                 "global_remaining": global_remaining,
                 "global_daily": global_daily,
-                "global_used": global_daily - global_remaining,
-                "global_used_percent": round(
-                    ((global_daily - global_remaining) / global_daily * 100) if global_daily > 0 else 0,
-                    2
-                ),
+                "global_used": global_used,
+                "global_used_percent": global_used_percent,
+                "deny_cache_size": self._deny_cache.size(),
             }
         except Exception as e:
             logger.error(f"Error getting quota status: {e}")
@@ -272,6 +595,7 @@ class QuotaGovernor:
                 "global_daily": 0,
                 "global_used": 0,
                 "global_used_percent": 0,
+                "deny_cache_size": self._deny_cache.size(),
             }
 
     async def get_client_quota_status(self, client_id: str) -> Dict[str, Any]:
@@ -285,15 +609,18 @@ class QuotaGovernor:
             Dictionary with client quota information
         """
         try:
-            remaining = int(await self.redis.get(f'quota:client:{client_id}:remaining') or 0)
-            tier = await self.get_client_tier(client_id)
-            paused = await self.is_client_paused(client_id)
+            # Read all three in one round-trip
+            remaining, tier_raw, paused = await self.redis.mget(
+                _client_remaining_key(client_id),
+                _client_tier_key(client_id),
+                _client_paused_key(client_id),
+            )
 
             return {
                 "client_id": client_id,
-                "remaining": remaining,
-                "tier": tier.value,
-                "paused": paused,
+                "remaining": int(remaining or 0),
+                "tier": self._parse_tier(client_id, tier_raw).value,
+                "paused": paused in (b'1', '1'),
             }
         except Exception as e:
             logger.error(f"Error getting client quota status for {client_id}: {e}")
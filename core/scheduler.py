@@ -5,9 +5,10 @@ Routes operations based on SLA tier and urgency with fairness guarantees.
 """
 
 import asyncio
+import heapq
 import time
 import logging
-from typing import Callable, Any, Coroutine, Optional, Dict
+from typing import Callable, Any, Coroutine, Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
@@ -23,17 +24,25 @@ SLA_WEIGHT: Dict[str, int] = {
     SLATier.BRONZE.value: 1,
 }
 
+# Queue priority for every (tier, urgency) pair, computed once at import:
+# base priority (100 - urgency) divided by tier weight. Lower value runs first.
+PRIORITY_TABLE: Dict[SLATier, Tuple[int, ...]] = {
+    tier: tuple((100 - urgency) // SLA_WEIGHT[tier.value] for urgency in range(100))
+    for tier in SLATier
+}
+
 
-@dataclass
+@dataclass(slots=True)
 class Operation:
     """
     Represents a scheduled operation.
 
-    Operations are prioritized by tier and urgency.
+    Operations are prioritized by tier and urgency; the scheduler orders
+    them by (priority, submission sequence).
     """
 
     priority: int
-    timestamp: float
+    timestamp: int  # time.monotonic_ns() at submit
     fn: Callable[..., Coroutine[Any, Any, Any]]
     args: tuple
     kwargs: dict
@@ -42,17 +51,6 @@ class Operation:
     urgency: int
     future: 'asyncio.Future[Any]'  # Completion signal for this specific operation
 
-    def __lt__(self, other: 'Operation') -> bool:
-        """
-        Compare operations for priority queue ordering.
-
-        Lower priority value = higher priority (processed first).
-        For same priority, earlier timestamp wins (FIFO).
-        """
-        if self.priority != other.priority:
-            return self.priority < other.priority
-        return self.timestamp < other.timestamp
-
     async def execute(self) -> Any:
         """Execute the operation."""
         return await self.fn(*self.args, **self.kwargs)
@@ -65,7 +63,10 @@ class SchedulerStats:
         self.submitted: int = 0
         self.completed: int = 0
         self.failed: int = 0
-        self.by_tier: Dict[str, int] = {tier.value: 0 for tier in SLATier}
+        self.cancelled: int = 0
+        # Keyed by member rather than tier.value (a descriptor call) since
+        # submit() bumps it on every operation
+        self.by_tier: Dict[SLATier, int] = {tier: 0 for tier in SLATier}
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -73,8 +74,9 @@ class SchedulerStats:
             "submitted": self.submitted,
             "completed": self.completed,
             "failed": self.failed,
-            "pending": self.submitted - self.completed - self.failed,
-            "by_tier": self.by_tier,
+            "cancelled": self.cancelled,
+            "pending": self.submitted - self.completed - self.failed - self.cancelled,
+            "by_tier": {tier.value: count for tier, count in self.by_tier.items()},
         }
 
 
@@ -94,7 +96,17 @@ class PriorityScheduler:
             workers: Number of concurrent worker tasks
         """
         self.workers = workers
-        self.queue: asyncio.PriorityQueue[Operation] = asyncio.PriorityQueue()
+        # Plain heap instead of asyncio.PriorityQueue: workers only need a
+        # "not empty" wakeup, and shutdown only needs an "all done" signal.
+        # Entries are (priority, seq, operation): lower priority value runs
+        # first, seq keeps FIFO order within a priority, and both compare as
+        # ints so the heap never calls into Operation.
+        self._heap: List[Tuple[int, int, Operation]] = []
+        self._seq = 0
+        self._not_empty = asyncio.Event()
+        self._unfinished = 0
+        self._all_done = asyncio.Event()
+        self._all_done.set()
         self.stats = SchedulerStats()
         self._worker_tasks: list[asyncio.Task[None]] = []
         self._running = False
@@ -123,19 +135,16 @@ class PriorityScheduler:
         Returns:
             Future that will be set with the result or exception when operation completes
         """
-        # Calculate priority: base priority from urgency, divided by tier weight
-        # Lower priority value = higher priority in queue
+        # Priority from urgency and tier weight (lower value = higher priority in queue)
         urgency_clamped = max(0, min(urgency, 99))
-        base_priority = 100 - urgency_clamped
-        tier_weight = SLA_WEIGHT.get(tier.value, 1)
-        priority = base_priority // tier_weight
+        priority = PRIORITY_TABLE[tier][urgency_clamped]
 
         # Create a future for this specific operation
-        future: asyncio.Future[Any] = asyncio.Future()
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
 
         operation = Operation(
             priority=priority,
-            timestamp=time.time(),
+            timestamp=time.monotonic_ns(),
             fn=fn,
             args=args,
             kwargs=kwargs,
@@ -145,19 +154,32 @@ class PriorityScheduler:
             future=future,
         )
 
-        await self.queue.put(operation)
-        self.stats.submitted += 1
-        self.stats.by_tier[tier.value] += 1
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, operation))
+        self._unfinished += 1
+        self._all_done.clear()
+        self._not_empty.set()
+        stats = self.stats
+        stats.submitted += 1
+        stats.by_tier[tier] += 1
 
+        # Lazy %-formatting: per-operation debug logs cost nothing when disabled
         logger.debug(
-            f"Submitted operation for client {client_id} "
-            f"(tier={tier.value}, urgency={urgency_clamped}, priority={priority})"
+            "Submitted operation for client %s (tier=%s, urgency=%d, priority=%d)",
+            client_id, tier.value, urgency_clamped, priority,
         )
 
         return future
 
     async def start(self) -> None:
-        """Start the scheduler workers."""
+        """
+        Start the scheduler workers.
+
+        Workers run on the caller's event loop. The API server runs under
+        uvicorn with loop="uvloop" (shipped with uvicorn[standard]), so
+        worker wakeups and Redis awaits use libuv's faster scheduling;
+        standalone callers can get the same with uvloop.run(main()).
+        """
         if self._running:
             logger.warning("Scheduler already running")
             return
@@ -181,7 +203,7 @@ class PriorityScheduler:
 
         # Wait for queue to be processed or timeout BEFORE stopping workers
         try:
-            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            await asyncio.wait_for(self._all_done.wait(), timeout=timeout)
         except asyncio.TimeoutError:
             logger.warning(f"Scheduler stop timed out after {timeout}s")
 
@@ -207,19 +229,30 @@ class PriorityScheduler:
         """
         logger.debug(f"Worker {worker_id} started")
 
+        heap = self._heap
+        not_empty = self._not_empty
         while self._running:
             try:
-                # Get next operation (blocks if queue empty)
-                operation = await asyncio.wait_for(
-                    self.queue.get(),
-                    timeout=1.0
-                )
+                # Get next operation (blocks if queue empty; stop() cancels the wait)
+                while not heap:
+                    not_empty.clear()
+                    await not_empty.wait()
+                _, _, operation = heapq.heappop(heap)
 
                 # Execute operation
                 try:
+                    # Caller stopped waiting (timed out) while it was queued
+                    if operation.future.done():
+                        self.stats.cancelled += 1
+                        logger.debug(
+                            "Worker %d skipping abandoned operation for client %s",
+                            worker_id, operation.client_id,
+                        )
+                        continue
+
                     logger.debug(
-                        f"Worker {worker_id} executing operation for client {operation.client_id} "
-                        f"(tier={operation.tier.value}, priority={operation.priority})"
+                        "Worker %d executing operation for client %s (tier=%s, priority=%d)",
+                        worker_id, operation.client_id, operation.tier.value, operation.priority,
                     )
 
                     result = await operation.execute()
@@ -230,7 +263,8 @@ class PriorityScheduler:
                         operation.future.set_result(result)
 
                     logger.debug(
-                        f"Worker {worker_id} completed operation for client {operation.client_id}"
+                        "Worker %d completed operation for client %s",
+                        worker_id, operation.client_id,
                     )
 
                 except Exception as e:
@@ -246,11 +280,10 @@ class PriorityScheduler:
                         operation.future.set_exception(e)
 
                 finally:
-                    self.queue.task_done()
+                    self._unfinished -= 1
+                    if not self._unfinished:
+                        self._all_done.set()
 
-            except asyncio.TimeoutError:
-                # Queue.get() timed out, continue loop
-                continue
             except asyncio.CancelledError:
                 logger.debug(f"Worker {worker_id} cancelled")
                 break
@@ -262,7 +295,7 @@ class PriorityScheduler:
     def get_stats(self) -> Dict[str, Any]:
         """Get scheduler statistics."""
         stats_dict = self.stats.to_dict()
-        stats_dict["queue_size"] = self.queue.qsize()
+        stats_dict["queue_size"] = len(self._heap)
         stats_dict["workers"] = self.workers
         stats_dict["running"] = self._running
         return stats_dict
@@ -271,13 +304,16 @@ class PriorityScheduler:
         """
         Wait for all queued operations to complete.
 
+        Meant for shutdown and tests; request handlers await the future
+        returned by submit() instead.
+
         Args:
             timeout: Maximum time to wait (None = wait forever)
         """
         if timeout:
-            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            await asyncio.wait_for(self._all_done.wait(), timeout=timeout)
         else:
-            await self.queue.join()
+            await self._all_done.wait()
 
     def is_running(self) -> bool:
         """Check if scheduler is running."""
@@ -297,5 +333,5 @@ class PriorityScheduler:
             "running": self._running,
             "workers_alive": sum(1 for task in self._worker_tasks if not task.done()),
             "workers_total": self.workers,
-            "queue_size": self.queue.qsize(),
+            "queue_size": len(self._heap),
         }
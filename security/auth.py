@@ -4,22 +4,28 @@ JWT authentication and RBAC for API endpoints.
 Implements RS256 JWT verification with role-based access control.
 """
 
+import hashlib
 import json
 import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
 from pathlib import Path
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
 
 from core.errors import AuthenticationError, AuthorizationError
 
 logger = logging.getLogger(__name__)
 
+# Verified tokens kept per JWTConfig so repeat requests skip RS256 verification
+TOKEN_CACHE_MAXSIZE = 4096
+
 
 class Role(str, Enum):
     """User roles for RBAC."""
@@ -29,8 +35,14 @@ class Role(str, Enum):
     VIEWER = "viewer"
 
 
-class TokenData(BaseModel):
-    """Decoded JWT token data."""
+@dataclass(slots=True, frozen=True)
+class TokenData:
+    """
+    Decoded JWT token data.
+
+    Built from claims PyJWT has already verified, so no model validation is
+    needed; frozen because cached instances are shared between requests.
+    """
 
     sub: str  # Subject (user ID)
     role: Role
@@ -51,6 +63,7 @@ class JWTConfig:
         audience: str = "ads-api",
         issuer: str = "ads-auth",
         expiry_minutes: int = 15,
+        allow_mock_keys: bool = False,
     ):
         """
         Initialize JWT configuration.
@@ -62,33 +75,58 @@ class JWTConfig:
             audience: Expected audience claim
             issuer: Expected issuer claim
             expiry_minutes: Token expiry in minutes
+            allow_mock_keys: Generate a throwaway key pair when no key file
+                exists at all (local development only)
         """
         self.algorithm = algorithm
         self.audience = audience
         self.issuer = issuer
         self.expiry_minutes = expiry_minutes
+        self.allow_mock_keys = allow_mock_keys
+        # blake2b(token) -> (exp timestamp, decoded token), least recently used first
+        self.token_cache: "OrderedDict[bytes, Tuple[float, TokenData]]" = OrderedDict()
 
-        # Load public key for verification
+        # Load public key for verification; without one, tokens are rejected
+        # unless mock keys are allowed (see ensure_keys)
+        self.public_key: Optional[str] = None
         public_path = Path(public_key_path)
         if public_path.exists():
             with open(public_path, 'r') as f:
                 self.public_key = f.read()
         else:
-            logger.warning(f"Public key not found at {public_key_path}, using mock key")
-            self.public_key = self._generate_mock_key()
+            logger.error(f"Public key not found at {public_key_path}")
 
         # Load private key for signing (optional)
-        self.private_key = None
+        self.private_key: Optional[str] = None
         if private_key_path:
             private_path = Path(private_key_path)
             if private_path.exists():
                 with open(private_path, 'r') as f:
                     self.private_key = f.read()
 
+        self._parse_keys()
+
+    def _parse_keys(self) -> None:
+        """Parse the PEM keys once; jwt.encode/decode accept the key objects directly."""
+        signer = jwt.get_algorithm_by_name(self.algorithm)
+        self.public_key_obj = signer.prepare_key(self.public_key) if self.public_key else None
+        self.private_key_obj = signer.prepare_key(self.private_key) if self.private_key else None
+
+    def ensure_keys(self) -> None:
+        """
+        Generate the development mock key pair, if allowed and no key was configured.
+
+        Never runs when a private key was loaded, so a missing public key
+        file can't silently swap a real signing key for a random one.
+        """
+        if self.public_key_obj is None and self.private_key is None and self.allow_mock_keys:
+            self.public_key = self._generate_mock_key()
+            self._parse_keys()
+
     def _generate_mock_key(self) -> str:
         """Generate a mock public key for development."""
         # In production, this should never be used
-        logger.warning("Using mock JWT public key - NOT FOR PRODUCTION")
+        logger.error("Using mock JWT key pair - NOT FOR PRODUCTION")
         from cryptography.hazmat.primitives.asymmetric import rsa
         from cryptography.hazmat.primitives import serialization
 
@@ -138,6 +176,10 @@ def verify_token(token: str, config: Optional[JWTConfig] = None) -> TokenData:
     """
     Verify and decode JWT token.
 
+    Successfully verified tokens are cached on the config (keyed by a
+    blake2b digest of the token) until their exp claim, so a client reusing
+    a token pays for signature verification once.
+
     Args:
         token: JWT token string
         config: JWT configuration (uses global if not provided)
@@ -150,12 +192,25 @@ def verify_token(token: str, config: Optional[JWTConfig] = None) -> TokenData:
     """
     if config is None:
         config = get_jwt_config()
+    if config.public_key_obj is None:
+        config.ensure_keys()
+        if config.public_key_obj is None:
+            raise AuthenticationError("Token verification unavailable: no public key configured")
+
+    cache = config.token_cache
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if cached[0] > time.time():
+            cache.move_to_end(cache_key)
+            return cached[1]
+        del cache[cache_key]
 
     try:
         # Decode and verify token
         payload = jwt.decode(
             token,
-            config.public_key,
+            config.public_key_obj,
             algorithms=[config.algorithm],
             audience=config.audience,
             issuer=config.issuer,
@@ -171,6 +226,10 @@ def verify_token(token: str, config: Optional[JWTConfig] = None) -> TokenData:
             iat=datetime.fromtimestamp(payload["iat"]),
         )
 
+        cache[cache_key] = (payload["exp"], token_data)
+        if len(cache) > TOKEN_CACHE_MAXSIZE:
+            cache.popitem(last=False)
+
         return token_data
 
     except jwt.ExpiredSignatureError:
@@ -204,8 +263,10 @@ def create_token(
     """
     if config is None:
         config = get_jwt_config()
+    if config.public_key_obj is None:
+        config.ensure_keys()
 
-    if not config.private_key:
+    if config.private_key_obj is None:
         raise RuntimeError("Private key not configured for token creation")
 
     now = datetime.utcnow()
@@ -218,7 +279,7 @@ def create_token(
         "exp": now + timedelta(minutes=config.expiry_minutes),
     }
 
-    token = jwt.encode(payload, config.private_key, algorithm=config.algorithm)
+    token = jwt.encode(payload, config.private_key_obj, algorithm=config.algorithm)
     return token
 
 
@@ -258,13 +319,16 @@ def require_role(allowed_roles: List[Role]):
     Returns:
         FastAPI dependency function
     """
+    allowed = frozenset(allowed_roles)
+    detail = f"Insufficient permissions. Required roles: {[r.value for r in allowed_roles]}"
+
     async def role_checker(
         token_data: TokenData = Depends(get_current_user)
     ) -> TokenData:
-        if token_data.role not in allowed_roles:
+        if token_data.role not in allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Insufficient permissions. Required roles: {[r.value for r in allowed_roles]}",
+                detail=detail,
             )
         return token_data
 
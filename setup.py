@@ -11,8 +11,11 @@ setup(
     install_requires=[
         "fastapi>=0.109.0",
         "uvicorn[standard]>=0.27.0",
+        "uvloop>=0.19.0; sys_platform != 'win32'",
+        "httptools>=0.6.1",
         "google-ads>=25.0.0",
-        "redis>=5.0.1",
+        "redis[hiredis]>=5.0.1",
+        "orjson>=3.9.10",
         "asyncpg>=0.29.0",
         "tenacity>=8.2.3",
         "pydantic>=2.5.0",
@@ -0,0 +1,145 @@
+"""Shared test fixtures."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+
+def _encode(value: Any) -> bytes:
+    """Encode a key or value the way redis-py sends it."""
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakePipeline:
+    """Records queued commands; execute() applies them in one round-trip."""
+
+    def __init__(self, redis: "FakeRedis", transaction: bool):
+        self.redis = redis
+        self.transaction = transaction
+        self.commands: List[Tuple[str, tuple]] = []
+        self.executed = False
+
+    def __getattr__(self, name: str):
+        def queue(*args: Any) -> "FakePipeline":
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        self.executed = True
+        self.redis.calls.append(("pipeline", tuple(self.commands)))
+        return [getattr(self.redis, f"_{name}")(*args) for name, args in self.commands]
+
+
+class FakeScript:
+    """Registered Lua script stub: returns (or raises) `result` and records each call."""
+
+    def __init__(self, redis: "FakeRedis", source: str):
+        self.redis = redis
+        self.source = source
+        self.result: Any = None
+        self.calls: List[Dict[str, Any]] = []
+
+    async def __call__(self, keys: Optional[list] = None, args: Optional[list] = None) -> Any:
+        self.calls.append({"keys": keys or [], "args": args or []})
+        self.redis.calls.append(("evalsha", tuple(keys or [])))
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeRedis:
+    """
+    Minimal in-memory stand-in for redis.asyncio.Redis.
+
+    Stores bytes like Redis does and records every round-trip in `calls`
+    as (command, args), so tests can assert both state and call counts.
+    """
+
+    def __init__(self) -> None:
+        self.data: Dict[bytes, bytes] = {}
+        self.ttls: Dict[bytes, int] = {}
+        self.calls: List[Tuple[str, tuple]] = []
+        self.pipelines: List[FakePipeline] = []
+        self.scripts: List[FakeScript] = []
+
+    def seed(self, values: Dict[Any, Any]) -> None:
+        """Store values directly, without recording calls."""
+        for key, value in values.items():
+            self.data[_encode(key)] = _encode(value)
+
+    def value(self, key: Any) -> Optional[bytes]:
+        """Read a stored value directly, without recording calls."""
+        return self.data.get(_encode(key))
+
+    def commands(self, name: str) -> List[tuple]:
+        """Arguments of every recorded call to one command."""
+        return [args for command, args in self.calls if command == name]
+
+    # Synchronous command implementations, shared with pipelines
+
+    def _get(self, key: Any) -> Optional[bytes]:
+        return self.data.get(_encode(key))
+
+    def _mget(self, *keys: Any) -> List[Optional[bytes]]:
+        return [self.data.get(_encode(key)) for key in keys]
+
+    def _set(self, key: Any, value: Any) -> bool:
+        self.data[_encode(key)] = _encode(value)
+        return True
+
+    def _delete(self, *keys: Any) -> int:
+        return sum(self.data.pop(_encode(key), None) is not None for key in keys)
+
+    def _incrby(self, key: Any, amount: int) -> int:
+        value = int(self.data.get(_encode(key), b"0")) + amount
+        self.data[_encode(key)] = _encode(value)
+        return value
+
+    def _decrby(self, key: Any, amount: int) -> int:
+        return self._incrby(key, -amount)
+
+    def _incr(self, key: Any) -> int:
+        return self._incrby(key, 1)
+
+    def _expire(self, key: Any, seconds: int) -> bool:
+        if _encode(key) not in self.data:
+            return False
+        self.ttls[_encode(key)] = seconds
+        return True
+
+    # redis.asyncio API
+
+    async def get(self, key: Any) -> Optional[bytes]:
+        self.calls.append(("get", (key,)))
+        return self._get(key)
+
+    async def mget(self, *keys: Any) -> List[Optional[bytes]]:
+        self.calls.append(("mget", keys))
+        return self._mget(*keys)
+
+    async def set(self, key: Any, value: Any) -> bool:
+        self.calls.append(("set", (key, value)))
+        return self._set(key, value)
+
+    async def delete(self, *keys: Any) -> int:
+        self.calls.append(("delete", keys))
+        return self._delete(*keys)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        pipe = FakePipeline(self, transaction)
+        self.pipelines.append(pipe)
+        return pipe
+
+    def register_script(self, source: str) -> FakeScript:
+        script = FakeScript(self, source)
+        self.scripts.append(script)
+        return script
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """In-memory Redis stand-in that records round-trips."""
+    return FakeRedis()
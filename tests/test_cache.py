@@ -1,7 +1,13 @@
 """Tests for caching module."""
 
+import asyncio
+import threading
+
+import orjson
 import pytest
-from core.cache import LRUCache, CacheStats
+from unittest.mock import AsyncMock, MagicMock
+import core.cache as cache_module
+from core.cache import LRUCache, CacheStats, CacheManager, NEGATIVE_CACHE_TTL, ServiceTTL, memoize
 
 
 class TestLRUCache:
@@ -141,3 +147,293 @@ class TestLRUCache:
         cache.set("key1", "value3")
         assert cache.get("key1") == "value3"
         assert cache.size() == 1
+
+    def test_full_shard_evicts_in_batches(self):
+        """Test that a full shard evicts several cold entries at once."""
+        cache = LRUCache(maxsize=40)
+        for i in range(40):
+            cache.set(f"key{i}", i)
+        cache.get("key0")
+
+        cache.set("key40", 40)
+
+        # 5% of 40: the two oldest unreferenced entries go, the hit one stays
+        assert cache.size() == 39
+        assert cache.get_stats().evictions == 2
+        assert cache.get("key0") == 0
+        assert cache.get("key1") is None
+        assert cache.get("key2") is None
+        assert cache.get("key40") == 40
+
+    def test_sharded_cache_respects_maxsize(self):
+        """Test that a sharded cache never holds more than maxsize entries."""
+        cache = LRUCache(maxsize=2048)
+
+        for i in range(10_000):
+            cache.set(f"key{i}", i)
+
+        assert cache.size() <= 2048
+        assert cache.get("key9999") == 9999
+        assert cache.get_stats().evictions == 10_000 - cache.size()
+
+    def test_concurrent_threads(self):
+        """Test that concurrent get/set from threads keeps the cache consistent."""
+        cache = LRUCache(maxsize=1024)
+
+        def worker(offset):
+            for i in range(2000):
+                cache.set(f"key{(offset + i) % 3000}", i)
+                cache.get(f"key{i % 3000}")
+
+        threads = [threading.Thread(target=worker, args=(n * 100,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.get_stats()
+        assert cache.size() <= 1024
+        assert stats.sets == 8 * 2000
+        assert stats.hits + stats.misses == 8 * 2000
+
+    def test_frequently_used_entry_survives_scan(self):
+        """Test that LRU-SP eviction keeps a hot entry during a one-off scan."""
+        cache = LRUCache(maxsize=8)
+
+        cache.set("hot", "value")
+        for _ in range(50):
+            cache.get("hot")
+
+        # Scan through more keys than the cache can hold
+        for i in range(20):
+            cache.set(f"scan{i}", "value")
+
+        assert cache.get("hot") == "value"
+        assert cache.size() == 8
+
+
+@pytest.mark.parametrize("service_type", [None, ["reporting"], {"name": "reporting"}, 42])
+def test_service_ttl_resolve_rejects_invalid_input(service_type):
+    """Test that null, non-string and unknown int service types raise ValueError."""
+    with pytest.raises(ValueError):
+        ServiceTTL.resolve(service_type)
+
+
+def test_memoize_caches_calls():
+    """Test that memoize serves repeat calls from the cache."""
+    calls = []
+
+    @memoize(maxsize=2)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    assert [double(1), double(1), double(2)] == [2, 2, 4]
+    assert calls == [1, 2]
+    assert double.cache_info().hits == 1
+
+
+class TestCacheManager:
+    """Tests for CacheManager implementation."""
+
+    @pytest.fixture
+    def pipeline_mock(self):
+        """Create mock Redis pipeline."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        return pipe
+
+    @pytest.fixture
+    def mock_redis(self, pipeline_mock):
+        """Create mock Redis client."""
+        redis = MagicMock()
+        redis.get = AsyncMock(return_value=None)
+        redis.set = AsyncMock(return_value=None)
+        redis.setex = AsyncMock()
+        redis.pipeline.return_value = pipeline_mock
+        redis.register_script.return_value = AsyncMock(return_value=0)
+        return redis
+
+    @pytest.fixture
+    async def cache_manager(self, mock_redis):
+        """Create CacheManager instance with mock Redis."""
+        manager = CacheManager(mock_redis, lru_maxsize=100)
+        yield manager
+        await manager.close()
+
+    @pytest.mark.asyncio
+    async def test_set_accepts_resolved_service_ttl(self, cache_manager, pipeline_mock):
+        """Test that a pre-resolved ServiceTTL is used directly as the TTL."""
+        assert ServiceTTL.resolve("budget") is ServiceTTL.BUDGET
+        assert ServiceTTL.resolve("unknown") == 300
+        assert ServiceTTL.resolve("default") == 300
+        # Every member is a distinct service, with no aliases
+        assert len(ServiceTTL.__members__) == len(ServiceTTL)
+
+        await cache_manager.set("key1", "value1", service_type=ServiceTTL.BUDGET)
+        await cache_manager.flush()
+
+        pipeline_mock.setex.assert_called_with("cache:key1", 3600, orjson.dumps("value1"))
+
+    @pytest.mark.asyncio
+    async def test_clear_pattern_one_script_call_per_page(self, cache_manager, mock_redis):
+        """Test that clear_pattern walks the SCAN cursor, one script call per page."""
+        clear_script = mock_redis.register_script.return_value
+        clear_script.side_effect = [[b"17", 3], [b"0", 2]]
+
+        deleted = await cache_manager.clear_pattern("cache:client:123:*")
+
+        assert deleted == 5
+        assert [call.kwargs["args"] for call in clear_script.await_args_list] == [
+            [0, "cache:client:123:*"],
+            [b"17", "cache:client:123:*"],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_single_flight(self, cache_manager, pipeline_mock):
+        """Test that concurrent misses for one key share a single loader call."""
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return [{"id": 1}]
+
+        results = await asyncio.gather(
+            *(cache_manager.get_or_compute("key1", loader) for _ in range(5))
+        )
+
+        assert calls == 1
+        assert all(result == [{"id": 1}] for result in results)
+
+        await cache_manager.flush()
+        pipeline_mock.setex.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_peek_then_fill(self, cache_manager):
+        """Test the synchronous LRU fast path and its async fallback."""
+        async def loader():
+            return {"id": 1}
+
+        assert cache_manager.peek("key1") is None
+        assert await cache_manager.fill("key1", loader) == {"id": 1}
+        assert cache_manager.peek("key1") == {"id": 1}
+
+        stats = cache_manager.hot_cache.get_stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_claims_cold_key_in_one_call(self, cache_manager, mock_redis):
+        """Test that the Redis lookup on a miss is a single SET NX GET."""
+        mock_redis.set.return_value = orjson.dumps({"id": 2})
+        loader = AsyncMock()
+
+        assert await cache_manager.get_or_compute("key1", loader) == {"id": 2}
+
+        loader.assert_not_awaited()
+        mock_redis.get.assert_not_awaited()
+        _, kwargs = mock_redis.set.call_args
+        assert kwargs["nx"] and kwargs["get"]
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_caches_empty_result_briefly(self, cache_manager, pipeline_mock):
+        """Test that empty results are cached in Redis only, with the negative-cache TTL."""
+        async def loader():
+            return []
+
+        result = await cache_manager.get_or_compute("key1", loader, service_type="campaign")
+
+        assert result == []
+        # Not kept in the LRU, which has no expiry
+        assert cache_manager.peek("key1") is None
+
+        await cache_manager.flush()
+        pipeline_mock.setex.assert_called_once_with("cache:key1", NEGATIVE_CACHE_TTL, b"[]")
+
+    @pytest.mark.asyncio
+    async def test_get_or_compute_propagates_errors(self, cache_manager):
+        """Test that loader errors reach every waiter and the flight is cleared."""
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(
+            *(cache_manager.get_or_compute("key1", loader) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache_manager._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_set_serializes_large_payload_in_thread(
+        self, cache_manager, pipeline_mock, monkeypatch
+    ):
+        """Test that large values are serialized off the event loop."""
+        offloaded = []
+        to_thread = asyncio.to_thread
+
+        async def spy_to_thread(fn, *args):
+            offloaded.append(fn)
+            return await to_thread(fn, *args)
+
+        monkeypatch.setattr(cache_module.asyncio, "to_thread", spy_to_thread)
+        rows = [{"id": i} for i in range(cache_module.OFFLOAD_MIN_ITEMS)]
+
+        await cache_manager.set("small", [{"id": 1}])
+        assert offloaded == []
+
+        await cache_manager.set("large", rows)
+        assert len(offloaded) == 1
+
+        await cache_manager.flush()
+        pipeline_mock.setex.assert_called_with("cache:large", 300, orjson.dumps(rows))
+
+    @pytest.mark.asyncio
+    async def test_set_does_not_wait_for_redis(self, cache_manager, mock_redis, pipeline_mock):
+        """Test that set() updates the LRU at once and batches Redis writes."""
+        for i in range(10):
+            await cache_manager.set(f"key{i}", i)
+
+        # Readable immediately, nothing sent to Redis yet
+        assert cache_manager.hot_cache.get("key9") == 9
+        pipeline_mock.execute.assert_not_awaited()
+
+        await cache_manager.flush()
+
+        # All ten writes went out in one pipeline
+        assert pipeline_mock.setex.call_count == 10
+        pipeline_mock.execute.assert_awaited_once()
+        mock_redis.setex.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_delete_drops_queued_write_without_draining_queue(
+        self, cache_manager, mock_redis, pipeline_mock
+    ):
+        """Test that delete() skips the key's queued write instead of waiting for the queue."""
+        mock_redis.delete = AsyncMock()
+        await cache_manager.set("gone", 1)
+        await cache_manager.set("kept", 2)
+
+        await cache_manager.delete("gone")
+
+        # Returned before the queued writes were sent
+        pipeline_mock.execute.assert_not_awaited()
+        mock_redis.delete.assert_awaited_once_with("cache:gone")
+
+        await cache_manager.flush()
+        written = [call.args[0] for call in pipeline_mock.setex.call_args_list]
+        assert written == ["cache:kept"]
+
+    def test_build_cache_key_is_stable_and_fixed_length(self, cache_manager):
+        """Test that params hash to a short key independent of kwarg order."""
+        key = cache_manager.build_cache_key("123", "gaql", query="SELECT x " * 100, page_size=10)
+        same = cache_manager.build_cache_key("123", "gaql", page_size=10, query="SELECT x " * 100)
+        other = cache_manager.build_cache_key("123", "gaql", query="SELECT x " * 100, page_size=20)
+
+        assert key == same
+        assert key != other
+        assert key.startswith("client:123:gaql:")
+        assert len(key) == len("client:123:gaql:") + 16
+        assert cache_manager.build_cache_key("123", "gaql") == "client:123:gaql"
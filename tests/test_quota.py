@@ -1,48 +1,54 @@
 """Tests for quota governor module."""
 
 import pytest
-from unittest.mock import AsyncMock, MagicMock
-from core.quota import QuotaGovernor, SLATier
+import redis.asyncio as redis
+from core.quota import AUDIT_KEY_TTL, QuotaGovernor, SLATier
+
+CLIENT_REMAINING = b'quota:client:test_client:remaining'
+CLIENT_TIER = b'client:test_client:tier'
+CLIENT_PAUSED = b'client:test_client:paused'
 
 
 class TestQuotaGovernor:
     """Tests for QuotaGovernor implementation."""
 
     @pytest.fixture
-    def mock_redis(self):
-        """Create mock Redis client."""
-        redis = AsyncMock()
-        return redis
+    def quota_governor(self, fake_redis):
+        """Create QuotaGovernor instance with fake Redis."""
+        return QuotaGovernor(fake_redis)
+
+    @pytest.fixture
+    def quota_fixture(self, fake_redis):
+        """Seed ample global/client quota; tests override single keys with seed()."""
+        table = {
+            'quota:global_remaining': 1000,
+            CLIENT_REMAINING: 500,
+            'quota:global_daily': 10000,
+        }
+        fake_redis.seed(table)
+        return table
 
     @pytest.fixture
-    def quota_governor(self, mock_redis):
-        """Create QuotaGovernor instance with mock Redis."""
-        return QuotaGovernor(mock_redis)
+    def admit_script(self, quota_governor):
+        """The registered admission script; tests set its result."""
+        return quota_governor._admit_script
 
     @pytest.mark.asyncio
-    async def test_can_run_with_sufficient_quota(self, quota_governor, mock_redis):
+    async def test_can_run_with_sufficient_quota(self, quota_governor, fake_redis, quota_fixture):
         """Test that operation can run when quota is sufficient."""
-        # Setup
-        mock_redis.get = AsyncMock(side_effect=lambda key: {
-            'quota:global_remaining': b'1000',
-            'quota:client:test_client:remaining': b'500',
-            'quota:global_daily': b'10000',
-        }.get(key, None))
-
         # Test
         can_run = await quota_governor.can_run("test_client", 100, SLATier.GOLD)
 
         assert can_run is True
+        assert [command for command, _ in fake_redis.calls] == ['mget']
 
     @pytest.mark.asyncio
-    async def test_can_run_with_insufficient_global_quota(self, quota_governor, mock_redis):
+    async def test_can_run_with_insufficient_global_quota(
+        self, quota_governor, fake_redis, quota_fixture
+    ):
         """Test that operation cannot run when global quota is insufficient."""
         # Setup
-        mock_redis.get = AsyncMock(side_effect=lambda key: {
-            'quota:global_remaining': b'50',  # Less than requested
-            'quota:client:test_client:remaining': b'500',
-            'quota:global_daily': b'10000',
-        }.get(key, None))
+        fake_redis.seed({'quota:global_remaining': 50})  # Less than requested
 
         # Test
         can_run = await quota_governor.can_run("test_client", 100, SLATier.GOLD)
@@ -50,14 +56,12 @@ class TestQuotaGovernor:
         assert can_run is False
 
     @pytest.mark.asyncio
-    async def test_can_run_with_insufficient_client_quota(self, quota_governor, mock_redis):
+    async def test_can_run_with_insufficient_client_quota(
+        self, quota_governor, fake_redis, quota_fixture
+    ):
         """Test that operation cannot run when client quota is insufficient."""
         # Setup
-        mock_redis.get = AsyncMock(side_effect=lambda key: {
-            'quota:global_remaining': b'1000',
-            'quota:client:test_client:remaining': b'50',  # Less than requested
-            'quota:global_daily': b'10000',
-        }.get(key, None))
+        fake_redis.seed({CLIENT_REMAINING: 50})  # Less than requested
 
         # Test
         can_run = await quota_governor.can_run("test_client", 100, SLATier.GOLD)
@@ -65,14 +69,9 @@ class TestQuotaGovernor:
         assert can_run is False
 
     @pytest.mark.asyncio
-    async def test_bronze_tier_throttling(self, quota_governor, mock_redis):
+    async def test_bronze_tier_throttling(self, quota_governor, quota_fixture):
         """Test that bronze tier is throttled when global quota is low."""
-        # Setup - global remaining < 15% of daily
-        mock_redis.get = AsyncMock(side_effect=lambda key: {
-            'quota:global_remaining': b'1000',  # 10% of daily
-            'quota:client:test_client:remaining': b'500',
-            'quota:global_daily': b'10000',
-        }.get(key, None))
+        # Setup - global remaining (1000) is 10% of daily, below the 15% reserve
 
         # Bronze should be throttled
         can_run = await quota_governor.can_run("test_client", 100, SLATier.BRONZE)
@@ -83,42 +82,46 @@ class TestQuotaGovernor:
         assert can_run is True
 
     @pytest.mark.asyncio
-    async def test_charge_quota(self, quota_governor, mock_redis):
-        """Test quota charging."""
+    async def test_charge_quota(self, quota_governor, fake_redis):
+        """Test that concurrent charges are coalesced into one pipeline."""
         # Setup
-        pipeline_mock = AsyncMock()
-        mock_redis.pipeline.return_value = pipeline_mock
-        pipeline_mock.decrby.return_value = pipeline_mock
-        pipeline_mock.execute.return_value = AsyncMock()
+        fake_redis.seed({'quota:global_remaining': 1000, CLIENT_REMAINING: 500})
 
         # Test
         await quota_governor.charge("test_client", 100)
+        await quota_governor.charge("test_client", 50)
+        await quota_governor.flush()
 
         # Verify
-        assert pipeline_mock.decrby.call_count == 2
-        pipeline_mock.execute.assert_called_once()
+        assert fake_redis.value('quota:global_remaining') == b'850'
+        assert fake_redis.value(CLIENT_REMAINING) == b'350'
+        assert len(fake_redis.commands('pipeline')) == 1
+
+        # The per-minute audit counter rides in the same pipeline
+        audit_keys = [key for key in fake_redis.data if key.startswith(b'quota:audit:')]
+        assert len(audit_keys) == 1
+        assert fake_redis.value(audit_keys[0]) == b'150'
+        assert fake_redis.ttls[audit_keys[0]] == AUDIT_KEY_TTL
 
     @pytest.mark.asyncio
-    async def test_refund_quota(self, quota_governor, mock_redis):
+    async def test_refund_quota(self, quota_governor, fake_redis):
         """Test quota refund."""
         # Setup
-        pipeline_mock = AsyncMock()
-        mock_redis.pipeline.return_value = pipeline_mock
-        pipeline_mock.incrby.return_value = pipeline_mock
-        pipeline_mock.execute.return_value = AsyncMock()
+        fake_redis.seed({'quota:global_remaining': 1000, CLIENT_REMAINING: 500})
 
         # Test
         await quota_governor.refund("test_client", 100)
+        await quota_governor.flush()
 
         # Verify
-        assert pipeline_mock.incrby.call_count == 2
-        pipeline_mock.execute.assert_called_once()
+        assert fake_redis.value('quota:global_remaining') == b'1100'
+        assert fake_redis.value(CLIENT_REMAINING) == b'600'
 
     @pytest.mark.asyncio
-    async def test_get_client_tier(self, quota_governor, mock_redis):
+    async def test_get_client_tier(self, quota_governor, fake_redis):
         """Test getting client tier."""
         # Setup
-        mock_redis.get.return_value = b'gold'
+        fake_redis.seed({CLIENT_TIER: 'gold'})
 
         # Test
         tier = await quota_governor.get_client_tier("test_client")
@@ -126,61 +129,64 @@ class TestQuotaGovernor:
         assert tier == SLATier.GOLD
 
     @pytest.mark.asyncio
-    async def test_get_client_tier_default(self, quota_governor, mock_redis):
-        """Test getting client tier defaults to bronze."""
+    async def test_get_client_tier_is_cached(self, quota_governor, fake_redis):
+        """Test that repeat tier lookups skip Redis until the tier is set."""
         # Setup
-        mock_redis.get.return_value = None
+        fake_redis.seed({CLIENT_TIER: 'gold'})
 
+        # Test
+        assert await quota_governor.get_client_tier("test_client") == SLATier.GOLD
+        fake_redis.seed({CLIENT_TIER: 'silver'})
+        assert await quota_governor.get_client_tier("test_client") == SLATier.GOLD
+        assert len(fake_redis.commands('get')) == 1
+
+        # Setting the tier invalidates the cached entry
+        await quota_governor.set_client_tier("test_client", SLATier.SILVER)
+        assert await quota_governor.get_client_tier("test_client") == SLATier.SILVER
+        assert len(fake_redis.commands('get')) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_client_tier_default(self, quota_governor, fake_redis):
+        """Test getting client tier defaults to bronze."""
         # Test
         tier = await quota_governor.get_client_tier("test_client")
 
         assert tier == SLATier.BRONZE
 
     @pytest.mark.asyncio
-    async def test_pause_and_resume_client(self, quota_governor, mock_redis):
+    async def test_pause_and_resume_client(self, quota_governor, fake_redis):
         """Test pausing and resuming a client."""
-        # Setup
-        mock_redis.get.return_value = None
-        mock_redis.set.return_value = AsyncMock()
-        mock_redis.delete.return_value = AsyncMock()
-
-        # Test pause
+        # Test pause - flag and generation bump share one pipeline
         await quota_governor.pause_client("test_client")
-        mock_redis.set.assert_called_with('client:test_client:paused', '1')
+        assert fake_redis.commands('pipeline') == [
+            (('set', (CLIENT_PAUSED, '1')), ('incr', (b'quota:gen',))),
+        ]
 
-        # Setup for is_paused check
-        mock_redis.get.return_value = b'1'
         is_paused = await quota_governor.is_client_paused("test_client")
         assert is_paused is True
 
         # Test resume
         await quota_governor.resume_client("test_client")
-        mock_redis.delete.assert_called_with('client:test_client:paused')
+        assert fake_redis.value(CLIENT_PAUSED) is None
+        assert fake_redis.value('quota:gen') == b'2'
+        assert await quota_governor.is_client_paused("test_client") is False
 
     @pytest.mark.asyncio
-    async def test_reset_global_quota(self, quota_governor, mock_redis):
+    async def test_reset_global_quota(self, quota_governor, fake_redis):
         """Test resetting global quota."""
-        # Setup
-        pipeline_mock = AsyncMock()
-        mock_redis.pipeline.return_value = pipeline_mock
-        pipeline_mock.set.return_value = pipeline_mock
-        pipeline_mock.execute.return_value = AsyncMock()
-
         # Test
         await quota_governor.reset_global_quota(100000)
 
         # Verify
-        assert pipeline_mock.set.call_count == 2
-        pipeline_mock.execute.assert_called_once()
+        assert fake_redis.value('quota:global_daily') == b'100000'
+        assert fake_redis.value('quota:global_remaining') == b'100000'
+        assert len(fake_redis.commands('pipeline')) == 1
 
     @pytest.mark.asyncio
-    async def test_get_quota_status(self, quota_governor, mock_redis):
+    async def test_get_quota_status(self, quota_governor, fake_redis):
         """Test getting quota status."""
         # Setup
-        mock_redis.get = AsyncMock(side_effect=lambda key: {
-            'quota:global_remaining': b'7500',
-            'quota:global_daily': b'10000',
-        }.get(key, b'0'))
+        fake_redis.seed({'quota:global_remaining': 7500, 'quota:global_daily': 10000})
 
         # Test
         status = await quota_governor.get_quota_status()
@@ -189,3 +195,92 @@ class TestQuotaGovernor:
         assert status["global_daily"] == 10000
         assert status["global_used"] == 2500
         assert status["global_used_percent"] == 25.0
+        assert fake_redis.calls == [('mget', (b'quota:global_remaining', b'quota:global_daily'))]
+
+    @pytest.mark.asyncio
+    async def test_get_client_quota_status(self, quota_governor, fake_redis):
+        """Test that client status is read in a single MGET."""
+        fake_redis.seed({CLIENT_REMAINING: 400, CLIENT_TIER: 'silver', CLIENT_PAUSED: '1'})
+
+        status = await quota_governor.get_client_quota_status("test_client")
+
+        assert status == {
+            "client_id": "test_client",
+            "remaining": 400,
+            "tier": "silver",
+            "paused": True,
+        }
+        assert [command for command, _ in fake_redis.calls] == ['mget']
+
+    @pytest.mark.asyncio
+    async def test_try_admit_uses_atomic_script(self, quota_governor, fake_redis, admit_script):
+        """Test that admission and charge run as one script call, with a reason on rejection."""
+        admit_script.result = [1, b'gold', 0, 900, 400, 10000, b'0']
+
+        admission = await quota_governor.try_admit("test_client", 100)
+
+        assert admission == (SLATier.GOLD, True, "", True)
+        assert len(admit_script.calls) == 1
+        assert admit_script.calls[0]["args"][0] == 100
+        assert fake_redis.commands('pipeline') == []
+
+        admit_script.result = [0, b'gold', 0, 50, 500, 10000, b'0']
+        admission = await quota_governor.try_admit("test_client", 100)
+        assert admission == (SLATier.GOLD, False, "Insufficient quota", False)
+
+    @pytest.mark.asyncio
+    async def test_try_admit_fails_open_uncharged(self, quota_governor, admit_script):
+        """Test that a Redis error admits the operation but reports it was not charged."""
+        admit_script.result = ConnectionError("redis down")
+
+        admission = await quota_governor.try_admit("test_client", 100)
+
+        assert admission == (SLATier.BRONZE, True, "", False)
+
+    @pytest.mark.asyncio
+    async def test_try_admit_remembers_rejections(self, quota_governor, admit_script):
+        """Test that a rejected client is denied locally until a smaller request or refund."""
+        admit_script.result = [0, b'gold', 0, 50, 500, 10000, b'0']
+
+        assert (await quota_governor.try_admit("test_client", 100))[1] is False
+        assert (await quota_governor.try_admit("test_client", 200))[1] is False
+        assert len(admit_script.calls) == 1
+
+        # A request that might fit still goes to Redis
+        admit_script.result = [1, b'gold', 0, 40, 490, 10000, b'0']
+        assert (await quota_governor.try_admit("test_client", 10))[1] is True
+        assert len(admit_script.calls) == 2
+
+        # A refund frees quota, so the cached denial is dropped
+        admit_script.result = [0, b'gold', 0, 40, 490, 10000, b'0']
+        await quota_governor.try_admit("test_client", 100)
+        await quota_governor.refund("test_client", 100)
+        admit_script.result = [1, b'gold', 0, 40, 390, 10000, b'0']
+        assert (await quota_governor.try_admit("test_client", 100))[1] is True
+        await quota_governor.flush()
+
+    @pytest.mark.asyncio
+    async def test_try_admit_drops_local_caches_on_generation_change(
+        self, quota_governor, admit_script
+    ):
+        """Test that a tier/pause change seen via quota:gen clears cached denials."""
+        admit_script.result = [0, b'bronze', 1, 0, 0, 0, b'1']
+        assert (await quota_governor.try_admit("test_client", 10))[1] is False
+
+        # Another process resumes the client: other clients' admissions see gen move
+        admit_script.result = [1, b'bronze', 0, 900, 400, 10000, b'2']
+        await quota_governor.try_admit("other_client", 10)
+
+        assert (await quota_governor.try_admit("test_client", 10))[1] is True
+        assert len(admit_script.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_from_url_builds_bounded_blocking_pool():
+    """Test that from_url gives the governor a blocking pool of the requested size."""
+    governor = QuotaGovernor.from_url("redis://localhost:6379/0", max_connections=8, timeout=1)
+    pool = governor.redis.connection_pool
+
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == 8
+    await governor.redis.aclose()